@@ -2,111 +2,162 @@
 Конфигурация системы парсинга ошибок
 """
 
+import functools
 import os
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, FrozenSet, List, Optional, Tuple
 from dotenv import load_dotenv
 
-# Загрузка переменных окружения
-load_dotenv()
+BASE_DIR = Path(__file__).parent
+LOGS_DIR = BASE_DIR / "logs"
 
+# Признак того, что .env уже прочитан в этом процессе
+_LOADED = False
+# Маркер в окружении: дочерние процессы (streamlit, uvicorn --reload)
+# наследуют уже загруженные переменные и не читают .env повторно
+_ENV_MARKER = "_ERRORFIX_ENV_LOADED"
+
+
+def _load_env():
+    """Однократная загрузка переменных окружения из .env"""
+    global _LOADED
+    if _LOADED:
+        return
+    if not os.environ.get(_ENV_MARKER):
+        load_dotenv(override=False)
+        os.environ[_ENV_MARKER] = "1"
+    _LOADED = True
+
+
+def _as_bool(value: str) -> bool:
+    return value.lower() == "true"
+
+
+def _env(name: str, default: Optional[str] = None, cast: Callable = str):
+    """Поле конфигурации, значение которого читается из окружения при создании"""
+    def factory():
+        value = os.getenv(name, default)
+        return cast(value) if value is not None else None
+    return field(default_factory=factory)
+
+
+@dataclass(frozen=True)
 class Config:
     """Центральная конфигурация приложения"""
-    
+
     # Пути
-    BASE_DIR = Path(__file__).parent
-    DATA_DIR = BASE_DIR / "data"
-    LOGS_DIR = BASE_DIR / "logs"
-    UPLOADS_DIR = BASE_DIR / "uploads"
-    
+    BASE_DIR: Path = BASE_DIR
+    DATA_DIR: Path = BASE_DIR / "data"
+    LOGS_DIR: Path = LOGS_DIR
+    UPLOADS_DIR: Path = BASE_DIR / "uploads"
+
     # База данных
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/error_parser.db")
-    CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./data/chroma")
-    
+    DATABASE_URL: str = _env("DATABASE_URL", "sqlite:///./data/error_parser.db")
+    CHROMA_PERSIST_DIR: str = _env("CHROMA_PERSIST_DIR", "./data/chroma")
+
     # LLM настройки
-    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")  # groq, ollama, openai
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
-    
+    LLM_PROVIDER: str = _env("LLM_PROVIDER", "groq")  # groq, ollama, openai
+    GROQ_API_KEY: Optional[str] = _env("GROQ_API_KEY")
+    OPENAI_API_KEY: Optional[str] = _env("OPENAI_API_KEY")
+    OLLAMA_BASE_URL: str = _env("OLLAMA_BASE_URL", "http://localhost:11434")
+    OLLAMA_MODEL: str = _env("OLLAMA_MODEL", "llama3.1:8b")
+
     # OCR настройки
-    TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
-    OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "rus+eng").split("+")
-    OCR_CONFIDENCE_THRESHOLD = float(os.getenv("OCR_CONFIDENCE_THRESHOLD", "60.0"))
-    
+    TESSERACT_CMD: str = _env("TESSERACT_CMD", "tesseract")
+    OCR_LANGUAGES: List[str] = _env("OCR_LANGUAGES", "rus+eng", lambda v: v.split("+"))
+    OCR_CONFIDENCE_THRESHOLD: float = _env("OCR_CONFIDENCE_THRESHOLD", "60.0", float)
+    # Число процессов OCR в API (по умолчанию - по числу ядер);
+    # каждый процесс держит свои модели OCR в памяти
+    OCR_WORKERS: Optional[int] = _env("OCR_WORKERS", None, int)
+
     # Веб-поиск
-    SEARCH_TIMEOUT = int(os.getenv("SEARCH_TIMEOUT", "10"))
-    MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "5"))
-    SEARCH_SOURCES = [
+    SEARCH_TIMEOUT: int = _env("SEARCH_TIMEOUT", "10", int)
+    MAX_SEARCH_RESULTS: int = _env("MAX_SEARCH_RESULTS", "5", int)
+    SEARCH_SOURCES: Tuple[str, ...] = (
         "stackoverflow.com",
-        "docs.microsoft.com", 
+        "docs.microsoft.com",
         "support.microsoft.com",
         "1c.ru",
         "infostart.ru"
-    ]
-    
+    )
+
     # Логирование
-    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    LOG_FORMAT = os.getenv("LOG_FORMAT", "{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} | {message}")
-    LOG_FILE = LOGS_DIR / "error_parser.log"
-    
+    LOG_LEVEL: str = _env("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = _env("LOG_FORMAT", "{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} | {message}")
+    LOG_FILE: Path = LOGS_DIR / "error_parser.log"
+
     # API настройки
-    API_HOST = os.getenv("API_HOST", "0.0.0.0")
-    API_PORT = int(os.getenv("API_PORT", "8000"))
-    API_DEBUG = os.getenv("API_DEBUG", "false").lower() == "true"
-    
+    API_HOST: str = _env("API_HOST", "0.0.0.0")
+    API_PORT: int = _env("API_PORT", "8000", int)
+    API_DEBUG: bool = _env("API_DEBUG", "false", _as_bool)
+    API_WORKERS: int = _env("API_WORKERS", "1", int)
+    # Разрешенные источники CORS через запятую
+    CORS_ORIGINS: Tuple[str, ...] = _env(
+        "CORS_ORIGINS", "*", lambda v: tuple(o.strip() for o in v.split(",") if o.strip())
+    )
+
     # Streamlit настройки
-    STREAMLIT_PORT = int(os.getenv("STREAMLIT_PORT", "8501"))
-    
+    STREAMLIT_PORT: int = _env("STREAMLIT_PORT", "8501", int)
+
     # Ограничения
-    MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10")) * 1024 * 1024  # 10MB
-    ALLOWED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".tiff"}
-    
+    MAX_FILE_SIZE: int = _env("MAX_FILE_SIZE", "10", lambda v: int(v) * 1024 * 1024)  # 10MB
+    ALLOWED_EXTENSIONS: FrozenSet[str] = frozenset({".png", ".jpg", ".jpeg", ".bmp", ".tiff"})
+
     # Redis настройки
-    REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-    REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-    REDIS_DB = int(os.getenv("REDIS_DB", "0"))
-    
+    REDIS_HOST: str = _env("REDIS_HOST", "localhost")
+    REDIS_PORT: int = _env("REDIS_PORT", "6379", int)
+    REDIS_DB: int = _env("REDIS_DB", "0", int)
+    ANALYSIS_CACHE_TTL: int = _env("ANALYSIS_CACHE_TTL", "3600", int)
+
     # Notion настройки
-    NOTION_API_KEY = os.getenv("NOTION_API_KEY")
-    NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
-    
+    NOTION_API_KEY: Optional[str] = _env("NOTION_API_KEY")
+    NOTION_DATABASE_ID: Optional[str] = _env("NOTION_DATABASE_ID")
+
     # Obsidian настройки
-    OBSIDIAN_VAULT_PATH = os.getenv("OBSIDIAN_VAULT_PATH", "./obsidian_vault")
-    
+    OBSIDIAN_VAULT_PATH: str = _env("OBSIDIAN_VAULT_PATH", "./obsidian_vault")
+
     # Clipboard мониторинг
-    ENABLE_CLIPBOARD_MONITORING = os.getenv("ENABLE_CLIPBOARD_MONITORING", "false").lower() == "true"
-    
-        @classmethod
-    def create_directories(cls):
+    ENABLE_CLIPBOARD_MONITORING: bool = _env("ENABLE_CLIPBOARD_MONITORING", "false", _as_bool)
+
+    @classmethod
+    def bootstrap(cls) -> "Config":
+        """Однократная подготовка окружения при запуске приложения"""
+        config = get_config()
+        config.create_directories()
+        return config
+
+    def create_directories(self):
         """Создание необходимых директорий"""
         try:
-            directories = [cls.DATA_DIR, cls.LOGS_DIR, cls.UPLOADS_DIR]
+            directories = [self.DATA_DIR, self.LOGS_DIR, self.UPLOADS_DIR]
             for directory in directories:
                 directory.mkdir(parents=True, exist_ok=True)
         except Exception as e:
             print(f"⚠️  Предупреждение: не удалось создать директории: {e}")
 
-    @classmethod
-    def validate_config(cls) -> list[str]:
+    def validate_config(self) -> List[str]:
         """Валидация конфигурации"""
         errors = []
-        
+
         # Проверка API ключей
-        if cls.LLM_PROVIDER == "groq" and not cls.GROQ_API_KEY:
+        if self.LLM_PROVIDER == "groq" and not self.GROQ_API_KEY:
             errors.append("GROQ_API_KEY не установлен для провайдера groq")
-        elif cls.LLM_PROVIDER == "openai" and not cls.OPENAI_API_KEY:
+        elif self.LLM_PROVIDER == "openai" and not self.OPENAI_API_KEY:
             errors.append("OPENAI_API_KEY не установлен для провайдера openai")
-        
+
         # Проверка Tesseract
         try:
             import pytesseract
             pytesseract.get_tesseract_version()
         except Exception:
             errors.append("Tesseract OCR не установлен или не найден")
-        
+
         return errors
 
-# Создание директорий при импорте
-Config.create_directories() 
\ No newline at end of file
+
+@functools.lru_cache(maxsize=None)
+def get_config() -> Config:
+    """Конфигурация приложения (окружение читается один раз на процесс)"""
+    _load_env()
+    return Config()
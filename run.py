@@ -6,6 +6,7 @@
 import sys
 import os
 import argparse
+import importlib.util
 import logging
 from pathlib import Path
 
@@ -27,25 +28,16 @@ def check_dependencies():
     """Проверка зависимостей"""
     missing_deps = []
     
-    try:
-        import cv2
-    except ImportError:
-        missing_deps.append("opencv-python")
-    
-    try:
-        import pytesseract
-    except ImportError:
-        missing_deps.append("pytesseract")
-    
-    try:
-        import easyocr
-    except ImportError:
-        missing_deps.append("easyocr")
-    
-    try:
-        import streamlit
-    except ImportError:
-        missing_deps.append("streamlit")
+    # find_spec проверяет наличие модуля, не выполняя его импорт
+    required_modules = {
+        "cv2": "opencv-python",
+        "pytesseract": "pytesseract",
+        "easyocr": "easyocr",
+        "streamlit": "streamlit",
+    }
+    for module_name, package_name in required_modules.items():
+        if importlib.util.find_spec(module_name) is None:
+            missing_deps.append(package_name)
     
     if missing_deps:
         print("❌ Отсутствуют зависимости:")
@@ -69,46 +61,53 @@ def init_database():
         print(f"❌ Ошибка инициализации базы данных: {e}")
         return False
 
-def run_streamlit():
+def run_streamlit(use_subprocess: bool = False):
     """Запуск Streamlit приложения"""
     try:
-        import subprocess
-        import sys
-        
         print("🚀 Запуск Streamlit приложения...")
         print("📱 Откройте браузер и перейдите по адресу: http://localhost:8501")
         print("⏹️ Для остановки нажмите Ctrl+C")
         
-        # Запуск Streamlit
-        subprocess.run([
-            sys.executable, "-m", "streamlit", "run", 
-            "src/streamlit_app.py", "--server.port", "8501"
-        ])
+        streamlit_args = ["run", "src/streamlit_app.py", "--server.port", "8501"]
+        
+        if use_subprocess:
+            import subprocess
+            subprocess.run([sys.executable, "-m", "streamlit", *streamlit_args])
+            return
+        
+        # Запуск в текущем интерпретаторе: без повторного старта Python
+        # и повторного импорта уже загруженных модулей
+        from streamlit.web import cli as stcli
+        sys.argv = ["streamlit", *streamlit_args]
+        sys.exit(stcli.main())
         
     except KeyboardInterrupt:
         print("\n👋 Приложение остановлено")
     except Exception as e:
         print(f"❌ Ошибка запуска Streamlit: {e}")
 
-def run_fastapi():
+def run_fastapi(use_subprocess: bool = False):
     """Запуск FastAPI сервера"""
     try:
-        import subprocess
-        import sys
-        
         print("🚀 Запуск FastAPI сервера...")
         print("📡 API доступен по адресу: http://localhost:8000")
         print("📚 Документация API: http://localhost:8000/docs")
         print("⏹️ Для остановки нажмите Ctrl+C")
         
-        # Запуск FastAPI
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "src.api.main:app", 
-            "--host", "0.0.0.0", 
-            "--port", "8000",
-            "--reload"
-        ])
+        if use_subprocess:
+            import subprocess
+            subprocess.run([
+                sys.executable, "-m", "uvicorn", 
+                "src.api.main:app", 
+                "--host", "0.0.0.0", 
+                "--port", "8000",
+                "--reload"
+            ])
+            return
+        
+        # Запуск в текущем интерпретаторе
+        import uvicorn
+        uvicorn.run("src.api.main:app", host="0.0.0.0", port=8000, reload=True)
         
     except KeyboardInterrupt:
         print("\n👋 API сервер остановлен")
@@ -128,12 +127,21 @@ def main():
         action="store_true",
         help="Проверить зависимости"
     )
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="Запускать Streamlit/FastAPI в отдельном процессе Python"
+    )
     
     args = parser.parse_args()
     
     # Настройка логирования
     setup_logging()
     
+    # Создание рабочих директорий
+    from config import Config
+    Config.bootstrap()
+    
     print("🔍 Умный парсер скриншотов ошибок")
     print("=" * 50)
     
@@ -158,9 +166,9 @@ def main():
     
     # Запуск в выбранном режиме
     if args.mode == "streamlit":
-        run_streamlit()
+        run_streamlit(use_subprocess=args.subprocess)
     elif args.mode == "fastapi":
-        run_fastapi()
+        run_fastapi(use_subprocess=args.subprocess)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
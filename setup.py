@@ -16,12 +16,24 @@ def print_step(step: str):
     print(f"\n🔧 {step}")
     print("=" * 50)
 
+def run_streaming(cmd: List[str], check: bool = False) -> int:
+    """Запуск команды с построчным выводом в терминал (без буферизации в памяти)"""
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          bufsize=1, text=True) as process:
+        for line in process.stdout:
+            sys.stdout.write(line)
+        returncode = process.wait()
+    
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
+
 def check_python_version() -> bool:
     """Проверка версии Python"""
     print_step("Проверка версии Python")
     
-    if sys.version_info < (3, 8):
-        print("❌ Требуется Python 3.8 или выше")
+    if sys.version_info < (3, 9):
+        print("❌ Требуется Python 3.9 или выше")
         print(f"Текущая версия: {sys.version}")
         return False
     
@@ -34,13 +46,13 @@ def install_dependencies() -> bool:
     
     try:
         # Установка основных зависимостей
-        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
-                      check=True, capture_output=True)
+        run_streaming([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], 
+                      check=True)
         print("✅ Основные зависимости установлены")
         
         # Установка в режиме разработки
-        subprocess.run([sys.executable, "-m", "pip", "install", "-e", "."], 
-                      check=True, capture_output=True)
+        run_streaming([sys.executable, "-m", "pip", "install", "-e", "."], 
+                      check=True)
         print("✅ Проект установлен в режиме разработки")
         
         return True
@@ -127,16 +139,13 @@ def run_tests() -> bool:
     print_step("Запуск тестов")
     
     try:
-        result = subprocess.run([sys.executable, "-m", "pytest", "tests/", "-v"], 
-                              capture_output=True, text=True)
+        returncode = run_streaming([sys.executable, "-m", "pytest", "tests/", "-v"])
         
-        if result.returncode == 0:
+        if returncode == 0:
             print("✅ Все тесты прошли успешно")
             return True
         else:
-            print("⚠️  Некоторые тесты не прошли:")
-            print(result.stdout)
-            print(result.stderr)
+            print("⚠️  Некоторые тесты не прошли (подробности в выводе выше)")
             return False
     except Exception as e:
         print(f"❌ Ошибка запуска тестов: {e}")
@@ -0,0 +1,78 @@
+"""
+Микробатчинг запросов классификации ошибок
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from .error_classifier import ErrorClassifier
+
+logger = logging.getLogger(__name__)
+
+
+class ClassificationBatcher:
+    """
+    Микробатчинг классификации: запросы, пришедшие почти одновременно,
+    классифицируются одним вызовом ErrorClassifier.classify_many
+    """
+    
+    def __init__(self, classifier: ErrorClassifier, max_size: int = 8, max_wait: float = 0.02):
+        self.classifier = classifier
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Запуск фоновой задачи сбора пакетов"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Остановка фоновой задачи"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+    
+    async def classify(self, error_text: str, error_info: Dict[str, str]):
+        """Классификация через очередь (без запущенной задачи - напрямую)"""
+        if self._worker is None:
+            return await self.classifier.classify_error_async(error_text, error_info)
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((error_text, error_info, future))
+        return await future
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Пакет закрывается по размеру или по истечении окна ожидания
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = await self.classifier.classify_many(
+                    [(error_text, error_info) for error_text, error_info, _ in batch]
+                )
+                for (_, _, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                logger.error(f"Ошибка пакетной классификации: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
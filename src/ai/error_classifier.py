@@ -2,37 +2,155 @@
 Модуль классификации ошибок с использованием LLM
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, List, Optional, Any
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 import re
 
-# Попытка импорта различных LLM провайдеров
 try:
-    from langchain.llms import Ollama
-    from langchain.chat_models import ChatOllama
-    OLLAMA_AVAILABLE = True
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
 except ImportError:
-    OLLAMA_AVAILABLE = False
+    AHOCORASICK_AVAILABLE = False
 
 try:
-    import groq
-    GROQ_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    GROQ_AVAILABLE = False
-
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Модели, используемые для каждого провайдера
+_PROVIDER_MODELS = {
+    'groq': 'llama3.1-8b-8192',
+    'openai': 'gpt-3.5-turbo',
+}
+
+# Размер кэша результатов классификации
+_CACHE_SIZE = 4096
+# Режим JSON ответа: провайдер гарантирует валидный JSON объект
+_RESPONSE_FORMAT = {"type": "json_object"}
+# Groq и OpenAI всегда отвечают в режиме JSON. Groq не поддерживает режим
+# JSON вместе с потоковой передачей, поэтому его ответ читается целиком;
+# OpenAI читается потоком до закрытия объекта
+_UNSTREAMED_JSON_PROVIDERS = frozenset({'groq'})
+
+# Текст разбивается на токены один раз; код ошибки - токен целиком
+_WORD_RE = re.compile(r'\w+')
+_CODE_RE = re.compile(r'\d{3,5}|0x[0-9A-Fa-f]{8}')
+
+# Общие категории (если категория приложения не определена)
+_GENERIC_CATEGORIES = (
+    ('sql', ('sql', 'запрос', 'база данных')),
+    ('rights', ('права', 'доступ', 'permission')),
+    ('connection', ('соединение', 'connection', 'сеть')),
+    ('file', ('файл', 'file', 'не найден')),
+)
+
+# Словарь серьезности: отдельные слова сверяются с токенами текста,
+# многословные фразы - с найденными ключевыми словами
+# Строки интернированы: сравнение с интернированными токенами текста
+# сводится к сравнению указателей
+_CRITICAL = frozenset(map(sys.intern, ('критическая', 'critical', 'fatal', 'bsod')))
+_HIGH = frozenset(map(sys.intern, ('ошибка', 'error', 'failed')))
+_MEDIUM = frozenset(map(sys.intern, ('предупреждение', 'warning', 'внимание')))
+
+_SEVERITY_LEVELS = (
+    ('critical', _CRITICAL, ('синий экран',)),
+    ('high', _HIGH, ('не удалось',)),
+    ('medium', _MEDIUM, ()),
+)
+
+
+# Предлагаемые действия по паре (тип приложения, категория), развернутые
+# в плоскую таблицу один раз при импорте модуля
+_SUGGESTED_ACTIONS = {
+    (application_type, category): tuple(actions)
+    for application_type, categories in {
+        '1c': {
+            'sql': ['Проверить SQL запрос', 'Проверить права доступа к базе данных'],
+            'config': ['Проверить конфигурацию', 'Обновить конфигурацию'],
+            'rights': ['Проверить права пользователя', 'Настроить роли доступа']
+        },
+        'windows': {
+            'system': ['Перезагрузить систему', 'Проверить системные файлы'],
+            'bsod': ['Проверить драйверы', 'Обновить систему'],
+            'service': ['Перезапустить службу', 'Проверить зависимости службы']
+        },
+        'office': {
+            'excel': ['Проверить формулы', 'Проверить ссылки на файлы'],
+            'word': ['Проверить шаблон', 'Проверить макросы']
+        }
+    }.items()
+    for category, actions in categories.items()
+}
+_DEFAULT_ACTIONS = ('Проверить логи', 'Перезапустить приложение')
+
+class _JsonObjectScanner:
+    """Инкрементальный поиск первого сбалансированного JSON объекта
+    (строки учитываются); текст можно подавать частями по мере поступления"""
+    __slots__ = ('buffer', 'start', 'pos', 'depth', 'in_string', 'escaped')
+    
+    def __init__(self):
+        self.buffer = ''
+        self.start = -1
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """Добавление фрагмента; возвращает объект, как только он закрыт"""
+        self.buffer += chunk
+        text = self.buffer
+        if self.start == -1:
+            self.start = text.find('{', self.pos)
+            if self.start == -1:
+                self.pos = len(text)
+                return None
+            self.pos = self.start
+        
+        for i in range(self.pos, len(text)):
+            char = text[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    return text[self.start:i + 1]
+        
+        self.pos = len(text)
+        return None
+
+
+def _find_json_object(text: str) -> Optional[str]:
+    """Первый сбалансированный JSON объект в тексте (строки учитываются)"""
+    return _JsonObjectScanner().feed(text)
+
+
+@dataclass(frozen=True)
 class ErrorClassification:
     """Результат классификации ошибки"""
+    # Слоты объявлены вручную (slots=True доступен только с Python 3.10)
+    __slots__ = ('application_type', 'error_category', 'severity',
+                 'keywords', 'confidence', 'suggested_actions')
+    
     application_type: str
     error_category: str
     severity: str
@@ -45,7 +163,11 @@ class ErrorClassifier:
     
     def __init__(self, llm_provider: str = "groq"):
         self.llm_provider = llm_provider
+        # Тип клиента LLM: SDK провайдера импортируется только при инициализации
+        self._provider_kind = None
         self.llm = self._initialize_llm()
+        # Асинхронный клиент создается лениво при первом async вызове
+        self._async_llm = None
         
         # Паттерны для классификации ошибок
         self.error_patterns = {
@@ -88,40 +210,132 @@ class ErrorClassifier:
                 }
             }
         }
+        
+        # Интернирование ключевых слов: одинаковые строки из разных категорий
+        # становятся одним объектом с закэшированным хэшем
+        for patterns in self.error_patterns.values():
+            patterns['keywords'] = [sys.intern(k) for k in patterns['keywords']]
+            for category, keywords in patterns['categories'].items():
+                patterns['categories'][category] = [sys.intern(k) for k in keywords]
+        
+        # Плоские таблицы паттернов для горячего пути классификации
+        # Ключевое слово -> (приоритет, тип приложения); при совпадении
+        # нескольких приложений побеждает объявленное раньше
+        self._app_rank = {}
+        for rank, (app_type, patterns) in enumerate(self.error_patterns.items()):
+            for keyword in patterns['keywords']:
+                self._app_rank.setdefault(keyword, (rank, app_type))
+        self._cat_table = {
+            app_type: tuple(
+                (category, tuple(keywords))
+                for category, keywords in patterns['categories'].items()
+            )
+            for app_type, patterns in self.error_patterns.items()
+        }
+        self._vocabulary = tuple(dict.fromkeys(
+            sys.intern(keyword.lower()) for keyword in self._iter_vocabulary()
+        ))
+        
+        # Автомат Ахо-Корасик по всем ключевым словам: один проход по тексту
+        self._automaton = self._build_automaton() if AHOCORASICK_AVAILABLE else None
+        
+        # LRU кэш результатов классификации (повторная отправка того же текста),
+        # общий для синхронного и асинхронного пути
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _iter_vocabulary(self):
+        """Все ключевые слова, используемые правилами классификации"""
+        for patterns in self.error_patterns.values():
+            yield from patterns['keywords']
+            for keywords in patterns['categories'].values():
+                yield from keywords
+        for _, keywords in _GENERIC_CATEGORIES:
+            yield from keywords
+        for _, _, phrases in _SEVERITY_LEVELS:
+            yield from phrases
+    
+    def _build_automaton(self):
+        """Построение автомата Ахо-Корасик по словарю ключевых слов"""
+        try:
+            automaton = ahocorasick.Automaton()
+            for keyword in self._vocabulary:
+                automaton.add_word(keyword, keyword)
+            automaton.make_automaton()
+            return automaton
+        except Exception as e:
+            logger.warning(f"Не удалось построить автомат ключевых слов: {e}")
+            return None
+    
+    def _match_keywords(self, text: str) -> set:
+        """Множество ключевых слов словаря, встречающихся в тексте"""
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(text)}
+        
+        return {keyword for keyword in self._vocabulary if keyword in text}
     
     def _initialize_llm(self):
         """Инициализация LLM провайдера"""
-        if self.llm_provider == "ollama" and OLLAMA_AVAILABLE:
+        if self.llm_provider == "ollama":
             try:
-                return ChatOllama(model="mistral:7b")
+                from langchain.chat_models import ChatOllama
+                llm = ChatOllama(model="mistral:7b")
+                self._provider_kind = "ollama"
+                return llm
+            except ImportError:
+                pass
             except Exception as e:
                 logger.warning(f"Не удалось инициализировать Ollama: {e}")
         
-        elif self.llm_provider == "groq" and GROQ_AVAILABLE:
+        elif self.llm_provider == "groq":
             try:
-                import os
+                import groq
                 api_key = os.getenv("GROQ_API_KEY")
                 if not api_key:
                     logger.warning("GROQ_API_KEY не найден в переменных окружения")
                     return None
-                return groq.Groq(api_key=api_key)
+                llm = groq.Groq(api_key=api_key)
+                self._provider_kind = "groq"
+                return llm
+            except ImportError:
+                pass
             except Exception as e:
                 logger.warning(f"Не удалось инициализировать Groq: {e}")
         
-        elif self.llm_provider == "openai" and OPENAI_AVAILABLE:
+        elif self.llm_provider == "openai":
             try:
-                import os
+                from openai import OpenAI
                 api_key = os.getenv("OPENAI_API_KEY")
                 if not api_key:
                     logger.warning("OPENAI_API_KEY не найден в переменных окружения")
                     return None
-                return OpenAI(api_key=api_key)
+                llm = OpenAI(api_key=api_key)
+                self._provider_kind = "openai"
+                return llm
+            except ImportError:
+                pass
             except Exception as e:
                 logger.warning(f"Не удалось инициализировать OpenAI: {e}")
         
         logger.warning("LLM недоступен, будет использоваться правило-основанная классификация")
         return None
     
+    def _cache_get(self, key: tuple) -> Optional[ErrorClassification]:
+        """Получение результата из LRU кэша"""
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+    
+    def _cache_put(self, key: tuple, result: ErrorClassification):
+        """Сохранение результата в LRU кэш"""
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            if len(self._cache) > _CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
     def classify_error(self, error_text: str, error_info: Dict[str, str]) -> ErrorClassification:
         """
         Классификация ошибки
@@ -133,50 +347,261 @@ class ErrorClassifier:
         Returns:
             Результат классификации
         """
+        error_text = error_text.strip()
         try:
+            cache_key = (error_text, tuple(sorted(error_info.items())))
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Сначала попробуем AI классификацию
             if self.llm:
                 ai_result = self._classify_with_ai(error_text, error_info)
                 if ai_result:
+                    self._cache_put(cache_key, ai_result)
                     return ai_result
+                # Сбой AI может быть временным: fallback не кэшируется
+                return self._classify_with_rules(error_text, error_info)
+            
+            # Правило-основанная классификация
+            result = self._classify_with_rules(error_text, error_info)
+            self._cache_put(cache_key, result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Ошибка при классификации: {e}")
+            return self._get_default_classification()
+    
+    async def classify_error_async(self, error_text: str, error_info: Dict[str, str]) -> ErrorClassification:
+        """
+        Асинхронная классификация ошибки (запрос к LLM не блокирует event loop)
+        
+        Args:
+            error_text: Текст ошибки
+            error_info: Дополнительная информация об ошибке
+            
+        Returns:
+            Результат классификации
+        """
+        if not self.llm:
+            return self.classify_error(error_text, error_info)
+        
+        async_llm = self._get_async_llm()
+        if async_llm is None:
+            # Ollama не имеет асинхронного клиента: выполняем в отдельном потоке
+            return await asyncio.to_thread(self.classify_error, error_text, error_info)
+        
+        error_text = error_text.strip()
+        try:
+            cache_key = (error_text, tuple(sorted(error_info.items())))
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+            
+            ai_result = await self._classify_with_ai_async(async_llm, error_text, error_info)
+            if ai_result:
+                self._cache_put(cache_key, ai_result)
+                return ai_result
             
-            # Fallback на правило-основанную классификацию
             return self._classify_with_rules(error_text, error_info)
             
         except Exception as e:
             logger.error(f"Ошибка при классификации: {e}")
             return self._get_default_classification()
     
+    async def classify_many(self, items: List[Tuple[str, Dict[str, str]]]) -> List[ErrorClassification]:
+        """
+        Пакетная классификация: тексты, которых нет в кэше, отправляются
+        в Groq/OpenAI одним запросом
+        
+        Args:
+            items: Список пар (текст ошибки, дополнительная информация)
+            
+        Returns:
+            Результаты классификации в порядке входных данных
+        """
+        results: List[Optional[ErrorClassification]] = [None] * len(items)
+        pending = []
+        for index, (error_text, error_info) in enumerate(items):
+            error_text = error_text.strip()
+            cached = self._cache_get((error_text, tuple(sorted(error_info.items()))))
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append((index, error_text, error_info))
+        
+        async_llm = self._get_async_llm() if self.llm else None
+        if len(pending) > 1 and async_llm is not None:
+            batch = await self._classify_batch_with_ai_async(
+                async_llm, [(text, info) for _, text, info in pending]
+            )
+            for (index, error_text, error_info), ai_result in zip(pending, batch):
+                if ai_result:
+                    self._cache_put((error_text, tuple(sorted(error_info.items()))), ai_result)
+                    results[index] = ai_result
+                else:
+                    # Сбой AI может быть временным: fallback не кэшируется
+                    results[index] = self._classify_with_rules(error_text, error_info)
+        else:
+            classified = await asyncio.gather(*(
+                self.classify_error_async(error_text, error_info)
+                for _, error_text, error_info in pending
+            ))
+            for (index, _, _), result in zip(pending, classified):
+                results[index] = result
+        
+        return results
+    
+    def _get_async_llm(self):
+        """Ленивая инициализация асинхронного клиента Groq/OpenAI"""
+        if self._async_llm is None and self._provider_kind in _PROVIDER_MODELS:
+            try:
+                if self._provider_kind == "groq":
+                    import groq
+                    self._async_llm = groq.AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+                else:
+                    from openai import AsyncOpenAI
+                    self._async_llm = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            except Exception as e:
+                logger.warning(f"Не удалось инициализировать асинхронный клиент LLM: {e}")
+        return self._async_llm
+    
     def _classify_with_ai(self, error_text: str, error_info: Dict[str, str]) -> Optional[ErrorClassification]:
         """Классификация с помощью AI"""
         try:
             prompt = self._create_classification_prompt(error_text, error_info)
             
-            if isinstance(self.llm, groq.Groq):
+            if self._provider_kind in _UNSTREAMED_JSON_PROVIDERS:
                 response = self.llm.chat.completions.create(
-                    model="llama3.1-8b-8192",
+                    model=_PROVIDER_MODELS[self._provider_kind],
                     messages=[{"role": "user", "content": prompt}],
-                    temperature=0.1
+                    temperature=0.1,
+                    response_format=_RESPONSE_FORMAT
                 )
-                result_text = response.choices[0].message.content
-                
-            elif isinstance(self.llm, OpenAI):
-                response = self.llm.chat.completions.create(
-                    model="gpt-3.5-turbo",
+                return self._classification_from_json(response.choices[0].message.content)
+            
+            if self._provider_kind in _PROVIDER_MODELS:
+                # Потоковый ответ (OpenAI): чтение прекращается, как только JSON объект закрыт
+                stream = self.llm.chat.completions.create(
+                    model=_PROVIDER_MODELS[self._provider_kind],
                     messages=[{"role": "user", "content": prompt}],
-                    temperature=0.1
+                    temperature=0.1,
+                    response_format=_RESPONSE_FORMAT,
+                    stream=True
                 )
-                result_text = response.choices[0].message.content
-                
-            else:  # Ollama
-                result_text = self.llm.invoke(prompt)
+                scanner = _JsonObjectScanner()
+                try:
+                    for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        json_text = scanner.feed(chunk.choices[0].delta.content or '')
+                        if json_text:
+                            return self._classification_from_json(json_text)
+                finally:
+                    stream.close()
+                return self._classification_from_json(scanner.buffer)
             
-            return self._parse_ai_response(result_text)
+            # Ollama: JSON ищется в произвольном тексте ответа
+            return self._parse_ai_response(self.llm.invoke(prompt))
             
         except Exception as e:
             logger.error(f"Ошибка AI классификации: {e}")
             return None
     
+    async def _classify_with_ai_async(self, async_llm, error_text: str,
+                                      error_info: Dict[str, str]) -> Optional[ErrorClassification]:
+        """Асинхронная классификация с помощью AI (Groq/OpenAI)"""
+        try:
+            prompt = self._create_classification_prompt(error_text, error_info)
+            
+            if self._provider_kind in _UNSTREAMED_JSON_PROVIDERS:
+                response = await async_llm.chat.completions.create(
+                    model=_PROVIDER_MODELS[self._provider_kind],
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.1,
+                    response_format=_RESPONSE_FORMAT
+                )
+                return self._classification_from_json(response.choices[0].message.content)
+            
+            stream = await async_llm.chat.completions.create(
+                model=_PROVIDER_MODELS[self._provider_kind],
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.1,
+                response_format=_RESPONSE_FORMAT,
+                stream=True
+            )
+            scanner = _JsonObjectScanner()
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    json_text = scanner.feed(chunk.choices[0].delta.content or '')
+                    if json_text:
+                        return self._classification_from_json(json_text)
+            finally:
+                await stream.close()
+            
+            return self._classification_from_json(scanner.buffer)
+            
+        except Exception as e:
+            logger.error(f"Ошибка AI классификации: {e}")
+            return None
+    
+    async def _classify_batch_with_ai_async(self, async_llm, items: List[Tuple[str, Dict[str, str]]]
+                                            ) -> List[Optional[ErrorClassification]]:
+        """Классификация нескольких ошибок одним запросом к LLM"""
+        try:
+            response = await async_llm.chat.completions.create(
+                model=_PROVIDER_MODELS[self._provider_kind],
+                messages=[{"role": "user", "content": self._create_batch_prompt(items)}],
+                temperature=0.1,
+                response_format=_RESPONSE_FORMAT
+            )
+            content = response.choices[0].message.content
+            data = orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+            
+            results = [self._classification_from_dict(item) for item in data.get('results', [])[:len(items)]]
+            return results + [None] * (len(items) - len(results))
+            
+        except Exception as e:
+            logger.error(f"Ошибка пакетной AI классификации: {e}")
+            return [None] * len(items)
+    
+    def _create_batch_prompt(self, items: List[Tuple[str, Dict[str, str]]]) -> str:
+        """Создание промпта для пакетной классификации"""
+        errors = "\n".join(
+            f"{number}. Текст ошибки: {error_text}\n   Дополнительная информация: {error_info}"
+            for number, (error_text, error_info) in enumerate(items, 1)
+        )
+        return f"""
+        Проанализируй каждую из {len(items)} ошибок и верни результат в JSON формате.
+        
+        {errors}
+        
+        Для каждой ошибки определи:
+        1. application_type: тип приложения (1c, windows, office, browser, other)
+        2. error_category: категория ошибки (sql, config, rights, system, connection, etc.)
+        3. severity: серьезность (low, medium, high, critical)
+        4. keywords: ключевые слова для поиска решения (массив строк)
+        5. confidence: уверенность в классификации (0-100)
+        6. suggested_actions: предлагаемые действия (массив строк)
+        
+        Ответ должен быть JSON объектом, где results - массив результатов
+        в том же порядке, что и ошибки:
+        {{
+            "results": [
+                {{
+                    "application_type": "string",
+                    "error_category": "string",
+                    "severity": "string",
+                    "keywords": ["string"],
+                    "confidence": number,
+                    "suggested_actions": ["string"]
+                }}
+            ]
+        }}
+        """
+    
     def _create_classification_prompt(self, error_text: str, error_info: Dict[str, str]) -> str:
         """Создание промпта для классификации"""
         return f"""
@@ -205,15 +630,27 @@ class ErrorClassifier:
         """
     
     def _parse_ai_response(self, response_text: str) -> Optional[ErrorClassification]:
-        """Парсинг ответа AI"""
+        """Парсинг ответа AI в свободной форме (Ollama)"""
+        # Извлечение JSON из ответа
+        json_text = _find_json_object(response_text)
+        if not json_text:
+            return None
+        
+        return self._classification_from_json(json_text)
+    
+    def _classification_from_json(self, json_text: str) -> Optional[ErrorClassification]:
+        """Разбор JSON объекта с результатом классификации"""
         try:
-            # Извлечение JSON из ответа
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if not json_match:
-                return None
-            
-            data = json.loads(json_match.group())
+            data = orjson.loads(json_text) if ORJSON_AVAILABLE else json.loads(json_text)
+            return self._classification_from_dict(data)
             
+        except Exception as e:
+            logger.error(f"Ошибка парсинга AI ответа: {e}")
+            return None
+    
+    def _classification_from_dict(self, data: Dict[str, Any]) -> Optional[ErrorClassification]:
+        """Построение результата классификации из словаря ответа AI"""
+        try:
             return ErrorClassification(
                 application_type=data.get('application_type', 'unknown'),
                 error_category=data.get('error_category', 'unknown'),
@@ -230,18 +667,22 @@ class ErrorClassifier:
     def _classify_with_rules(self, error_text: str, error_info: Dict[str, str]) -> ErrorClassification:
         """Правило-основанная классификация"""
         text_lower = error_text.lower()
+        matched = self._match_keywords(text_lower)
+        # Единственный проход токенизации, общий для всех детекторов
+        words = list(map(sys.intern, _WORD_RE.findall(text_lower)))
+        tokens = frozenset(words)
         
         # Определение типа приложения
-        application_type = self._detect_application_type(text_lower, error_info)
+        application_type = self._detect_application_type(matched, error_info)
         
         # Определение категории ошибки
-        error_category = self._detect_error_category(text_lower, application_type)
+        error_category = self._detect_error_category(matched, application_type)
         
         # Определение серьезности
-        severity = self._detect_severity(text_lower)
+        severity = self._detect_severity(tokens, matched)
         
         # Извлечение ключевых слов
-        keywords = self._extract_keywords(text_lower, application_type)
+        keywords = self._extract_keywords(words, application_type)
         
         # Предлагаемые действия
         suggested_actions = self._get_suggested_actions(application_type, error_category)
@@ -255,96 +696,67 @@ class ErrorClassifier:
             suggested_actions=suggested_actions
         )
     
-    def _detect_application_type(self, text: str, error_info: Dict[str, str]) -> str:
+    def _detect_application_type(self, matched: set, error_info: Dict[str, str]) -> str:
         """Определение типа приложения"""
         # Проверка информации из OCR
         if error_info.get('application'):
             return error_info['application']
         
-        # Анализ текста
-        for app_type, patterns in self.error_patterns.items():
-            if any(keyword in text for keyword in patterns['keywords']):
-                return app_type
+        # Анализ найденных ключевых слов: проход только по совпадениям,
+        # а не по всей таблице приложений
+        ranks = [self._app_rank[keyword] for keyword in matched if keyword in self._app_rank]
+        if ranks:
+            return min(ranks)[1]
         
         return 'unknown'
     
-    def _detect_error_category(self, text: str, application_type: str) -> str:
+    def _detect_error_category(self, matched: set, application_type: str) -> str:
         """Определение категории ошибки"""
-        if application_type in self.error_patterns:
-            categories = self.error_patterns[application_type]['categories']
-            
-            for category, keywords in categories.items():
-                if any(keyword in text for keyword in keywords):
+        for category, keywords in self._cat_table.get(application_type, ()):
+            for keyword in keywords:
+                if keyword in matched:
                     return category
         
         # Общие категории
-        if any(word in text for word in ['sql', 'запрос', 'база данных']):
-            return 'sql'
-        elif any(word in text for word in ['права', 'доступ', 'permission']):
-            return 'rights'
-        elif any(word in text for word in ['соединение', 'connection', 'сеть']):
-            return 'connection'
-        elif any(word in text for word in ['файл', 'file', 'не найден']):
-            return 'file'
+        for category, keywords in _GENERIC_CATEGORIES:
+            if any(keyword in matched for keyword in keywords):
+                return category
         
         return 'unknown'
     
-    def _detect_severity(self, text: str) -> str:
+    def _detect_severity(self, tokens: frozenset, matched: set) -> str:
         """Определение серьезности ошибки"""
-        critical_keywords = ['критическая', 'critical', 'fatal', 'синий экран', 'bsod']
-        high_keywords = ['ошибка', 'error', 'failed', 'не удалось']
-        medium_keywords = ['предупреждение', 'warning', 'внимание']
-        
-        if any(keyword in text for keyword in critical_keywords):
-            return 'critical'
-        elif any(keyword in text for keyword in high_keywords):
-            return 'high'
-        elif any(keyword in text for keyword in medium_keywords):
-            return 'medium'
+        for severity, words, phrases in _SEVERITY_LEVELS:
+            if tokens & words or any(phrase in matched for phrase in phrases):
+                return severity
         
         return 'low'
     
-    def _extract_keywords(self, text: str, application_type: str) -> List[str]:
+    def _extract_keywords(self, words: List[str], application_type: str) -> List[str]:
         """Извлечение ключевых слов"""
-        keywords = []
+        # dict вместо list + set: дубликаты отбрасываются с сохранением порядка
+        keywords: Dict[str, None] = {}
         
         # Добавление ключевых слов из паттернов
         if application_type in self.error_patterns:
-            keywords.extend(self.error_patterns[application_type]['keywords'])
+            keywords.update(dict.fromkeys(self.error_patterns[application_type]['keywords']))
         
-        # Извлечение кодов ошибок
-        error_codes = re.findall(r'\b\d{3,5}\b|\b0x[0-9A-Fa-f]{8}\b', text)
-        keywords.extend(error_codes)
+        # Извлечение кодов ошибок и первых 5 важных слов
+        important_words = []
+        for token in words:
+            if _CODE_RE.fullmatch(token):
+                keywords[token] = None
+            # Коды длиной от 4 символов тоже считаются словами
+            if len(token) >= 4 and len(important_words) < 5:
+                important_words.append(token)
+        keywords.update(dict.fromkeys(important_words))
         
-        # Извлечение важных слов
-        important_words = re.findall(r'\b\w{4,}\b', text)
-        keywords.extend(important_words[:5])  # Первые 5 слов
-        
-        return list(set(keywords))  # Удаление дубликатов
+        return list(keywords)
     
     def _get_suggested_actions(self, application_type: str, error_category: str) -> List[str]:
         """Получение предлагаемых действий"""
-        actions = {
-            '1c': {
-                'sql': ['Проверить SQL запрос', 'Проверить права доступа к базе данных'],
-                'config': ['Проверить конфигурацию', 'Обновить конфигурацию'],
-                'rights': ['Проверить права пользователя', 'Настроить роли доступа']
-            },
-            'windows': {
-                'system': ['Перезагрузить систему', 'Проверить системные файлы'],
-                'bsod': ['Проверить драйверы', 'Обновить систему'],
-                'service': ['Перезапустить службу', 'Проверить зависимости службы']
-            },
-            'office': {
-                'excel': ['Проверить формулы', 'Проверить ссылки на файлы'],
-                'word': ['Проверить шаблон', 'Проверить макросы']
-            }
-        }
-        
-        if application_type in actions and error_category in actions[application_type]:
-            return actions[application_type][error_category]
-        
-        return ['Проверить логи', 'Перезапустить приложение']
+        actions = _SUGGESTED_ACTIONS.get((application_type, error_category), _DEFAULT_ACTIONS)
+        return list(actions)
     
     def _get_default_classification(self) -> ErrorClassification:
         """Получение классификации по умолчанию"""
@@ -354,5 +766,5 @@ class ErrorClassifier:
             severity='medium',
             keywords=[],
             confidence=0.0,
-            suggested_actions=['Проверить логи', 'Перезапустить приложение']
+            suggested_actions=list(_DEFAULT_ACTIONS)
         ) 
\ No newline at end of file
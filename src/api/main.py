@@ -2,24 +2,32 @@
 FastAPI приложение для парсера ошибок
 """
 
+import asyncio
+import hashlib
 import os
+import sys
 import uuid
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Optional
 
+import aiofiles
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, BackgroundTasks
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 
-from config import Config
-from src.ocr.image_preprocessor import ImagePreprocessor
-from src.ocr.text_extractor import TextExtractor
+from config import get_config
+from src.ocr.ocr_worker import create_ocr_pool, run_ocr_pipeline
 from src.ai.error_classifier import ErrorClassifier
-from src.database.knowledge_base import KnowledgeBase
-from src.search.web_search import WebSearch
+from src.ai.classification_batcher import ClassificationBatcher
+from src.database.knowledge_base import KnowledgeBase, Solution
+from src.search.web_search import WebSearch, create_async_client
+from src.utils.cache import AsyncCacheManager
 from src.api.models import (
     UploadScreenshotResponse, AnalyzeErrorResponse, AddSolutionRequest,
     AddSolutionResponse, FeedbackRequest, StatisticsResponse, ErrorResponse
@@ -27,81 +35,173 @@ from src.api.models import (
 
 # Инициализация логгера
 from loguru import logger
-logger.add(Config.LOG_FILE, rotation="1 day", retention="7 days")
+logger.add(get_config().LOG_FILE, rotation="1 day", retention="7 days")
 
 app = FastAPI(
     title="Error Screenshot Parser API",
     description="API для анализа скриншотов ошибок и поиска решений",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson сериализует ответы (включая datetime) быстрее стандартного json
+    default_response_class=ORJSONResponse
 )
 
+# Сжатие ответов (результаты анализа и списки решений - десятки КБ JSON);
+# добавляется до CORS, чтобы CORS оставался внешним слоем
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=list(get_config().CORS_ORIGINS),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 # Инициализация компонентов
-preprocessor = ImagePreprocessor()
-extractor = TextExtractor()
-classifier = ErrorClassifier(llm_provider=Config.LLM_PROVIDER)
+classifier = ErrorClassifier(llm_provider=get_config().LLM_PROVIDER)
 knowledge_base = KnowledgeBase()
-web_search = WebSearch()
+web_http = create_async_client()
+web_search = WebSearch(async_client=web_http)
+cache = AsyncCacheManager(
+    host=get_config().REDIS_HOST,
+    port=get_config().REDIS_PORT,
+    db=get_config().REDIS_DB
+)
+
+# Пул процессов для CPU-bound OCR, создается при запуске приложения
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Пул процессов для OCR обработки"""
+    if _ocr_pool is None:
+        raise RuntimeError("Пул процессов OCR не запущен")
+    return _ocr_pool
+
+classification_batcher = ClassificationBatcher(classifier)
 
 @app.on_event("startup")
 async def startup_event():
     """Инициализация при запуске"""
+    global _ocr_pool
     logger.info("Запуск Error Screenshot Parser API")
+    get_config().create_directories()
+    await cache.connect()
+    # Пакетирование имеет смысл только для запросов к LLM
+    if classifier.llm:
+        classification_batcher.start()
+    # Пул создается здесь, а не при первом запросе, и с явным способом
+    # запуска процессов (без fork): потоки и соединения приложения
+    # в процессы OCR не копируются
+    if _ocr_pool is None:
+        _ocr_pool = create_ocr_pool(get_config().OCR_WORKERS)
     
     # Валидация конфигурации
-    errors = Config.validate_config()
+    errors = get_config().validate_config()
     if errors:
         logger.error(f"Ошибки конфигурации: {errors}")
         raise RuntimeError(f"Ошибки конфигурации: {errors}")
     
     logger.info("API готов к работе")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Освобождение ресурсов при остановке"""
+    global _ocr_pool
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown(wait=False, cancel_futures=True)
+        _ocr_pool = None
+    await cache.close()
+    await classification_batcher.stop()
+    if web_http is not None:
+        await web_http.aclose()
+
+# Размер блока при потоковой записи загружаемого файла
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+# Время жизни метаданных загруженного файла (путь, расширение, хеш)
+FILE_META_TTL = 24 * 3600
+# Содержимое небольших файлов дополнительно держится в Redis, чтобы анализ
+# сразу после загрузки не перечитывал файл с диска
+IMAGE_BUFFER_MAX_SIZE = 2 << 20  # 2 MiB
+IMAGE_BUFFER_TTL = 600
+
+# Кэш ответов, зависящих от базы знаний (сбрасывается при ее изменении)
+API_CACHE_PREFIX = "api:"
+STATISTICS_CACHE_TTL = 60
+SOLUTIONS_CACHE_TTL = 300
+
+async def invalidate_api_cache():
+    """Сброс кэшированных ответов после изменения базы знаний"""
+    await cache.clear_pattern(f"{API_CACHE_PREFIX}*")
+
 @app.post("/api/upload-screenshot", response_model=UploadScreenshotResponse)
 async def upload_screenshot(file: UploadFile = File(...)):
     """Загрузка скриншота ошибки"""
+    config = get_config()
     try:
         # Проверка расширения файла
         file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in Config.ALLOWED_EXTENSIONS:
+        if file_ext not in config.ALLOWED_EXTENSIONS:
             raise HTTPException(
                 status_code=400,
-                detail=f"Неподдерживаемый формат файла. Разрешены: {Config.ALLOWED_EXTENSIONS}"
+                detail=f"Неподдерживаемый формат файла. Разрешены: {', '.join(sorted(config.ALLOWED_EXTENSIONS))}"
             )
         
         # Проверка размера файла
-        if file.size > Config.MAX_FILE_SIZE:
+        if file.size is not None and file.size > config.MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400,
-                detail=f"Файл слишком большой. Максимальный размер: {Config.MAX_FILE_SIZE // (1024*1024)}MB"
+                detail=f"Файл слишком большой. Максимальный размер: {config.MAX_FILE_SIZE // (1024*1024)}MB"
             )
         
         # Генерация уникального ID файла
         file_id = str(uuid.uuid4())
         filename = f"{file_id}{file_ext}"
-        file_path = Config.UPLOADS_DIR / filename
+        file_path = config.UPLOADS_DIR / filename
         
-        # Сохранение файла
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Потоковое сохранение файла блоками: запись не блокирует event loop,
+        # в памяти держится не больше одного блока
+        total = 0
+        hasher = hashlib.sha256()
+        image_chunks = []
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if total > config.MAX_FILE_SIZE:
+                    break
+                hasher.update(chunk)
+                await buffer.write(chunk)
+                if total <= IMAGE_BUFFER_MAX_SIZE:
+                    image_chunks.append(chunk)
         
-        logger.info(f"Файл загружен: {filename}, размер: {len(content)} байт")
+        if total > config.MAX_FILE_SIZE:
+            file_path.unlink(missing_ok=True)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Файл слишком большой. Максимальный размер: {config.MAX_FILE_SIZE // (1024*1024)}MB"
+            )
+        
+        # Метаданные файла: analyze_error находит его без перебора расширений,
+        # хеш содержимого - ключ кэша результатов анализа
+        await cache.set(
+            f"file:{file_id}",
+            {"path": str(file_path), "ext": file_ext, "sha256": hasher.hexdigest()},
+            expire=FILE_META_TTL
+        )
+        if total <= IMAGE_BUFFER_MAX_SIZE:
+            await cache.set_raw(f"img:{file_id}", b"".join(image_chunks), expire=IMAGE_BUFFER_TTL)
+        
+        logger.info(f"Файл загружен: {filename}, размер: {total} байт")
         
         return UploadScreenshotResponse(
             file_id=file_id,
             filename=filename,
-            size=len(content),
+            size=total,
             uploaded_at=datetime.now()
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка загрузки файла: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -109,73 +209,103 @@ async def upload_screenshot(file: UploadFile = File(...)):
 @app.post("/api/analyze-error", response_model=AnalyzeErrorResponse)
 async def analyze_error(file_id: str, additional_context: str = None):
     """Анализ ошибки на скриншоте"""
+    config = get_config()
     try:
         start_time = time.time()
         
-        # Поиск файла
+        # Поиск файла по метаданным загрузки; перебор расширений - только
+        # если метаданных нет (Redis недоступен или запись устарела)
         file_path = None
-        for ext in Config.ALLOWED_EXTENSIONS:
-            potential_path = Config.UPLOADS_DIR / f"{file_id}{ext}"
-            if potential_path.exists():
-                file_path = potential_path
-                break
+        file_meta = await cache.get(f"file:{file_id}") or {}
+        if file_meta:
+            file_path = Path(file_meta["path"])
+        else:
+            for ext in config.ALLOWED_EXTENSIONS:
+                potential_path = config.UPLOADS_DIR / f"{file_id}{ext}"
+                if potential_path.exists():
+                    file_path = potential_path
+                    break
         
         if not file_path:
             raise HTTPException(status_code=404, detail="Файл не найден")
         
         logger.info(f"Анализ ошибки для файла: {file_path}")
         
-        # OCR обработка
-        import cv2
-        import numpy as np
-        from PIL import Image
-        
-        image = cv2.imread(str(file_path))
-        if image is None:
-            raise HTTPException(status_code=400, detail="Не удалось загрузить изображение")
-        
-        # Предобработка
-        processed_image = preprocessor.preprocess_image(image)
-        
-        # Извлечение текста
-        ocr_results = extractor.extract_text(processed_image)
-        if not ocr_results:
-            raise HTTPException(status_code=400, detail="Не удалось распознать текст на изображении")
-        
-        best_result = extractor.select_best_result(ocr_results)
-        
-        # Классификация ошибки
-        error_info = extractor.extract_structured_error_info(best_result.text)
-        classification = classifier.classify_error(best_result.text, error_info)
+        # Повторная загрузка того же скриншота: OCR, классификация и
+        # веб-решения берутся из кэша. Локальная база знаний опрашивается
+        # при каждом запросе, чтобы ответ учитывал ее изменения
+        digest = file_meta.get("sha256")
+        recognized = await cache.get(f"recognition:{digest}") if digest else None
+        from_cache = recognized is not None
+        if from_cache:
+            logger.info(f"Результат распознавания взят из кэша: {digest}")
+        else:
+            # OCR обработка в отдельном процессе: event loop продолжает
+            # обслуживать другие запросы
+            # Содержимое файла берется из Redis, если оно там еще есть
+            image_bytes = await cache.get_raw(f"img:{file_id}")
+            loop = asyncio.get_running_loop()
+            ocr_output = await loop.run_in_executor(
+                get_ocr_pool(), run_ocr_pipeline, image_bytes or str(file_path)
+            )
+            if ocr_output is None:
+                raise HTTPException(status_code=400, detail="Не удалось загрузить изображение")
+            
+            best_result, error_info = ocr_output
+            if best_result is None:
+                raise HTTPException(status_code=400, detail="Не удалось распознать текст на изображении")
+            
+            # Классификация ошибки
+            classification = await classification_batcher.classify(best_result.text, error_info)
+            
+            recognized = {
+                "ocr_result": {
+                    "text": best_result.text,
+                    "confidence": best_result.confidence,
+                    "engine": best_result.engine,
+                    "language": "rus+eng"
+                },
+                "classification": classification,
+                "error_codes": error_info.get("error_codes", [])
+            }
         
-        # Поиск решений
-        local_solutions = knowledge_base.search_solutions(
-            best_result.text, 
-            limit=5
-        )
+        error_text = recognized["ocr_result"]["text"]
         
-        web_solutions = web_search.search_solutions(best_result.text)
+        # Поиск решений: локальная база (в потоке) и веб-поиск выполняются
+        # параллельно, время этапа - максимум, а не сумма задержек
+        if from_cache:
+            local_solutions = await asyncio.to_thread(knowledge_base.search_solutions, error_text, limit=5)
+            web_solutions = recognized["web_solutions"]
+        else:
+            local_solutions, web_solutions = await asyncio.gather(
+                asyncio.to_thread(knowledge_base.search_solutions, error_text, limit=5),
+                web_search.search_solutions_async(error_text)
+            )
         
         processing_time = time.time() - start_time
         
         logger.info(f"Анализ завершен за {processing_time:.2f} секунд")
         
-        return AnalyzeErrorResponse(
+        response = AnalyzeErrorResponse(
             analysis={
-                "ocr_result": {
-                    "text": best_result.text,
-                    "confidence": best_result.confidence,
-                    "engine": best_result.engine,
-                    "language": "rus+eng"
-                },
-                "classification": classification,
+                **recognized,
                 "solutions": local_solutions,
                 "web_solutions": web_solutions,
-                "processing_time": processing_time,
-                "error_codes": error_info.get("error_codes", [])
+                "processing_time": processing_time
             }
         )
         
+        if digest and not from_cache:
+            await cache.set(
+                f"recognition:{digest}",
+                response.analysis.model_dump(
+                    mode="json", include={"ocr_result", "classification", "error_codes", "web_solutions"}
+                ),
+                expire=config.ANALYSIS_CACHE_TTL
+            )
+        
+        return response
+        
     except Exception as e:
         logger.error(f"Ошибка анализа: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -184,9 +314,15 @@ async def analyze_error(file_id: str, additional_context: str = None):
 async def get_solutions(error_id: str):
     """Получение решений для конкретной ошибки"""
     try:
-        # Здесь можно добавить кеширование результатов
+        cache_key = f"{API_CACHE_PREFIX}solutions:{error_id}"
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         solutions = knowledge_base.search_solutions(error_id, limit=10)
-        return {"solutions": solutions}
+        result = {"solutions": jsonable_encoder(solutions)}
+        await cache.set(cache_key, result, expire=SOLUTIONS_CACHE_TTL)
+        return result
     except Exception as e:
         logger.error(f"Ошибка получения решений: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -195,8 +331,6 @@ async def get_solutions(error_id: str):
 async def add_solution(request: AddSolutionRequest):
     """Добавление нового решения"""
     try:
-        from src.database.knowledge_base import Solution
-        
         solution = Solution(
             title=request.title,
             description=request.description,
@@ -209,6 +343,7 @@ async def add_solution(request: AddSolutionRequest):
         )
         
         solution_id = knowledge_base.add_solution(solution)
+        await invalidate_api_cache()
         
         logger.info(f"Добавлено новое решение: {solution_id}")
         
@@ -218,14 +353,17 @@ async def add_solution(request: AddSolutionRequest):
         logger.error(f"Ошибка добавления решения: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def apply_feedback(solution_id: int, was_helpful: bool):
+    """Запись обратной связи в базу знаний (фоновая задача)"""
+    await asyncio.to_thread(knowledge_base.update_success_rate, solution_id, was_helpful)
+    await invalidate_api_cache()
+
 @app.post("/api/feedback")
-async def submit_feedback(request: FeedbackRequest):
+async def submit_feedback(request: FeedbackRequest, background_tasks: BackgroundTasks):
     """Отправка обратной связи"""
     try:
-        knowledge_base.update_success_rate(
-            request.solution_id, 
-            request.was_helpful
-        )
+        # Запись выполняется после отправки ответа клиенту
+        background_tasks.add_task(apply_feedback, request.solution_id, request.was_helpful)
         
         logger.info(f"Получена обратная связь для решения {request.solution_id}")
         
@@ -239,15 +377,23 @@ async def submit_feedback(request: FeedbackRequest):
 async def get_statistics():
     """Получение статистики системы"""
     try:
+        cache_key = f"{API_CACHE_PREFIX}statistics"
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return StatisticsResponse.model_validate(cached)
+        
         stats = knowledge_base.get_statistics()
         
-        return StatisticsResponse(
+        response = StatisticsResponse(
             total_errors_processed=stats.get("total_errors", 0),
             total_solutions=stats.get("total_solutions", 0),
             average_processing_time=stats.get("avg_processing_time", 0.0),
             most_common_errors=stats.get("common_errors", []),
             success_rate=stats.get("success_rate", 0.0)
         )
+        await cache.set(cache_key, response.model_dump(mode="json"), expire=STATISTICS_CACHE_TTL)
+        
+        return response
         
     except Exception as e:
         logger.error(f"Ошибка получения статистики: {e}")
@@ -256,12 +402,18 @@ async def get_statistics():
 @app.get("/health")
 async def health_check():
     """Проверка состояния API"""
-    return {"status": "healthy", "timestamp": datetime.now()}
+    # Unix timestamp: эндпоинт часто опрашивается балансировщиком
+    return {"status": "healthy", "timestamp": time.time()}
 
 if __name__ == "__main__":
+    config = get_config()
     uvicorn.run(
         "src.api.main:app",
-        host=Config.API_HOST,
-        port=Config.API_PORT,
-        reload=Config.API_DEBUG
+        host=config.API_HOST,
+        port=config.API_PORT,
+        reload=config.API_DEBUG,
+        # uvloop недоступен на Windows, там остается стандартный цикл asyncio
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=config.API_WORKERS
     ) 
\ No newline at end of file
@@ -4,9 +4,13 @@ Pydantic модели для API
 
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
 
+class APIModel(BaseModel):
+    """Базовая модель API: лишние поля отбрасываются, экземпляры неизменяемы"""
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
 class ErrorSeverity(str, Enum):
     """Уровни серьезности ошибок"""
     LOW = "low"
@@ -23,7 +27,7 @@ class ApplicationType(str, Enum):
     ANTIVIRUS = "antivirus"
     OTHER = "other"
 
-class ErrorClassification(BaseModel):
+class ErrorClassification(APIModel):
     """Классификация ошибки"""
     application_type: ApplicationType
     category: str
@@ -32,7 +36,7 @@ class ErrorClassification(BaseModel):
     suggested_actions: List[str]
     confidence: float = Field(ge=0.0, le=1.0)
 
-class Solution(BaseModel):
+class Solution(APIModel):
     """Решение проблемы"""
     id: Optional[int] = None
     title: str
@@ -43,14 +47,14 @@ class Solution(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
-class OCRResult(BaseModel):
+class OCRResult(APIModel):
     """Результат OCR"""
     text: str
     confidence: float
     engine: str
     language: str
 
-class ErrorAnalysis(BaseModel):
+class ErrorAnalysis(APIModel):
     """Анализ ошибки"""
     ocr_result: OCRResult
     classification: ErrorClassification
@@ -59,29 +63,29 @@ class ErrorAnalysis(BaseModel):
     processing_time: float
     error_codes: List[str] = []
 
-class UploadScreenshotRequest(BaseModel):
+class UploadScreenshotRequest(APIModel):
     """Запрос на загрузку скриншота"""
     description: Optional[str] = None
 
-class UploadScreenshotResponse(BaseModel):
+class UploadScreenshotResponse(APIModel):
     """Ответ на загрузку скриншота"""
     file_id: str
     filename: str
     size: int
     uploaded_at: datetime
 
-class AnalyzeErrorRequest(BaseModel):
+class AnalyzeErrorRequest(APIModel):
     """Запрос на анализ ошибки"""
     file_id: str
     additional_context: Optional[str] = None
 
-class AnalyzeErrorResponse(BaseModel):
+class AnalyzeErrorResponse(APIModel):
     """Ответ на анализ ошибки"""
     analysis: ErrorAnalysis
     status: str = "success"
     message: Optional[str] = None
 
-class AddSolutionRequest(BaseModel):
+class AddSolutionRequest(APIModel):
     """Запрос на добавление решения"""
     title: str
     description: str
@@ -90,19 +94,19 @@ class AddSolutionRequest(BaseModel):
     error_codes: List[str] = []
     keywords: List[str] = []
 
-class AddSolutionResponse(BaseModel):
+class AddSolutionResponse(APIModel):
     """Ответ на добавление решения"""
     solution_id: int
     status: str = "success"
     message: str = "Решение добавлено успешно"
 
-class FeedbackRequest(BaseModel):
+class FeedbackRequest(APIModel):
     """Запрос обратной связи"""
     solution_id: int
     was_helpful: bool
     comment: Optional[str] = None
 
-class StatisticsResponse(BaseModel):
+class StatisticsResponse(APIModel):
     """Статистика системы"""
     total_errors_processed: int
     total_solutions: int
@@ -110,7 +114,7 @@ class StatisticsResponse(BaseModel):
     most_common_errors: List[Dict[str, Any]]
     success_rate: float
 
-class ErrorResponse(BaseModel):
+class ErrorResponse(APIModel):
     """Стандартный ответ об ошибке"""
     status: str = "error"
     message: str
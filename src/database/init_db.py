@@ -172,10 +172,10 @@ def init_sample_data():
     # Объединение всех решений
     all_solutions = c1_solutions + windows_solutions + office_solutions + browser_solutions
     
-    # Добавление решений в базу
-    added_count = 0
-    for solution_data in all_solutions:
-        solution = Solution(
+    # Добавление решений в базу одной транзакцией
+    created_at = datetime.now().isoformat()
+    solutions = [
+        Solution(
             id=None,
             error_text=solution_data["error_text"],
             solution_text=solution_data["solution_text"],
@@ -183,16 +183,13 @@ def init_sample_data():
             error_category=solution_data["error_category"],
             source=solution_data["source"],
             success_rate=solution_data["success_rate"],
-            created_at=datetime.now().isoformat(),
+            created_at=created_at,
             tags=solution_data["tags"],
             steps=solution_data["steps"]
         )
-        
-        if knowledge_base.add_solution(solution):
-            added_count += 1
-            logger.info(f"Добавлено решение: {solution_data['error_text'][:50]}...")
-        else:
-            logger.error(f"Ошибка добавления решения: {solution_data['error_text'][:50]}...")
+        for solution_data in all_solutions
+    ]
+    added_count = knowledge_base.add_solutions_bulk(solutions)
     
     logger.info(f"Инициализация завершена. Добавлено {added_count} решений из {len(all_solutions)}")
     
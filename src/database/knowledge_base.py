@@ -3,12 +3,19 @@
 """
 
 import sqlite3
+import functools
+import heapq
 import json
 import logging
+import re
+import time
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import os
-from dataclasses import dataclass, asdict
+import threading
+from dataclasses import dataclass
 
 try:
     import chromadb
@@ -23,11 +30,194 @@ try:
 except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import faiss
+    import numpy as np
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+_INSERT_SOLUTION_SQL = '''
+    INSERT INTO solutions 
+    (error_text, solution_text, application_type, error_category, 
+     source, success_rate, created_at, tags, steps)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SELECT_SOLUTION_SQL = 'SELECT * FROM solutions WHERE id = ?'
+_SELECT_ALL_SOLUTIONS_SQL = 'SELECT * FROM solutions'
+_UPDATE_SUCCESS_RATE_SQL = 'UPDATE solutions SET success_rate = ? WHERE id = ?'
+
+# Число параметров в одном запросе (не больше ограничения старых сборок
+# SQLite в 999; степень двойки - для группировки запросов по размеру)
+_MAX_SQL_VARIABLES = 512
+
+# Текстовый поиск: варианты с фильтром по приложению и без него
+# собраны заранее, текст SQL не склеивается при каждом вызове
+_FTS_SEARCH_SQL = '''
+    SELECT s.id FROM solutions_fts f
+    JOIN solutions s ON s.id = f.rowid
+    WHERE solutions_fts MATCH ?
+    ORDER BY bm25(solutions_fts) LIMIT ?
+'''
+_FTS_SEARCH_APP_SQL = '''
+    SELECT s.id FROM solutions_fts f
+    JOIN solutions s ON s.id = f.rowid
+    WHERE solutions_fts MATCH ? AND s.application_type = ?
+    ORDER BY bm25(solutions_fts) LIMIT ?
+'''
+_LIKE_SEARCH_SQL = '''
+    SELECT id FROM solutions
+    WHERE error_text LIKE ? OR solution_text LIKE ?
+    ORDER BY success_rate DESC LIMIT ?
+'''
+_LIKE_SEARCH_APP_SQL = '''
+    SELECT id FROM solutions
+    WHERE (error_text LIKE ? OR solution_text LIKE ?) AND application_type = ?
+    ORDER BY success_rate DESC LIMIT ?
+'''
+
+
+@functools.lru_cache(maxsize=None)
+def _solutions_by_ids_sql(count: int) -> Tuple[str, int]:
+    """
+    Запрос решений по списку ID с сохранением порядка
+    
+    Число мест округляется вверх до степени двойки, чтобы разные длины
+    списков использовали несколько одинаковых подготовленных выражений.
+    
+    Returns:
+        Текст SQL и число параметров в нем
+    """
+    size = 1 << max(count - 1, 0).bit_length()
+    ranks = ','.join(f'(?, {rank})' for rank in range(size))
+    sql = f'''
+        WITH q(id, rank) AS (VALUES {ranks})
+        SELECT s.* FROM solutions s JOIN q USING(id)
+        ORDER BY q.rank
+    '''
+    return sql, size
+
+# Размер кэша подготовленных выражений на соединение: запросы с одинаковым
+# текстом SQL не разбираются и не планируются повторно
+_CACHED_STATEMENTS = 256
+
+# Версия схемы базы решений:
+# 1 - теги хранятся строкой через запятую вместо JSON
+_SCHEMA_VERSION = 1
+
+# JSON-колонка steps и экспорт: orjson при наличии
+if ORJSON_AVAILABLE:
+    def _json_bytes(value) -> bytes:
+        return orjson.dumps(value)
+    _json_loads = orjson.loads
+else:
+    def _json_bytes(value) -> bytes:
+        return json.dumps(value, ensure_ascii=False).encode('utf-8')
+    _json_loads = json.loads
+
+
+def _json_text(value) -> str:
+    return _json_bytes(value).decode('utf-8')
+
+# Полнотекстовый индекс по решениям (внешнее содержимое - таблица solutions),
+# синхронизируется триггерами
+_FTS_SCHEMA = (
+    '''
+    CREATE VIRTUAL TABLE solutions_fts USING fts5(
+        error_text, solution_text,
+        content='solutions', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS solutions_fts_ai AFTER INSERT ON solutions BEGIN
+        INSERT INTO solutions_fts(rowid, error_text, solution_text)
+        VALUES (new.id, new.error_text, new.solution_text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS solutions_fts_ad AFTER DELETE ON solutions BEGIN
+        INSERT INTO solutions_fts(solutions_fts, rowid, error_text, solution_text)
+        VALUES ('delete', old.id, old.error_text, old.solution_text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS solutions_fts_au
+    AFTER UPDATE OF error_text, solution_text ON solutions BEGIN
+        INSERT INTO solutions_fts(solutions_fts, rowid, error_text, solution_text)
+        VALUES ('delete', old.id, old.error_text, old.solution_text);
+        INSERT INTO solutions_fts(rowid, error_text, solution_text)
+        VALUES (new.id, new.error_text, new.solution_text);
+    END
+    ''',
+)
+
+_WORD_RE = re.compile(r'\w+')
+
+# Настройки соединения: WAL позволяет читать параллельно с записью,
+# а кэш страниц и mmap остаются прогретыми между запросами
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Параметры HNSW-графа коллекции ChromaDB (M и construction_ef задаются
+# только при создании коллекции)
+_HNSW_M = 16
+_HNSW_CONSTRUCTION_EF = 200
+# Ширина поиска по размеру базы: (верхняя граница числа векторов, search_ef)
+_HNSW_SEARCH_EF_TIERS = ((100_000, 64), (1_000_000, 100))
+_HNSW_SEARCH_EF_MAX = 200
+
+# Статистика базы знаний за один проход по результатам
+_STATISTICS_SQL = '''
+    SELECT 'total', NULL, COUNT(*), AVG(success_rate) FROM solutions
+    UNION ALL
+    SELECT 'app', application_type, COUNT(*), NULL FROM solutions GROUP BY application_type
+    UNION ALL
+    SELECT 'cat', error_category, COUNT(*), NULL FROM solutions GROUP BY error_category
+'''
+
+# Потоки для векторного поиска (текстовый идет в вызывающем потоке)
+_SEARCH_WORKERS = 4
+
+# Сглаживающая константа Reciprocal Rank Fusion
+_RRF_K = 60
+
+# Размер пакета при добавлении решений в ChromaDB
+_VECTOR_BATCH_SIZE = 64
+
+# Модель эмбеддингов решений и запросов (ChromaDB и локальный индекс Faiss)
+_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Кэш эмбеддингов запросов и найденных по ним ID решений
+_QUERY_EMBEDDING_CACHE_SIZE = 1024
+_SEARCH_CACHE_SIZE = 256
+_SEARCH_CACHE_TTL = 300
+# Число кластеров IVF; до _FAISS_IVF_MIN_SIZE векторов используется точный поиск,
+# так как обучение IVF на малой выборке дает плохие центроиды
+_FAISS_NLIST = 100
+_FAISS_IVF_MIN_SIZE = _FAISS_NLIST * 40
+_FAISS_NPROBE = 10
+
 @dataclass
 class Solution:
     """Структура решения"""
+    # Слоты объявлены вручную (slots=True доступен только с Python 3.10)
+    __slots__ = ('id', 'error_text', 'solution_text', 'application_type',
+                 'error_category', 'source', 'success_rate', 'created_at',
+                 'tags', 'steps')
+    
     id: Optional[int]
     error_text: str
     solution_text: str
@@ -39,6 +229,34 @@ class Solution:
     tags: List[str]
     steps: List[str]
 
+
+# Модели эмбеддингов общие для всех экземпляров KnowledgeBase в процессе:
+# загрузка занимает секунды и гигабайты памяти
+_MODEL_CACHE: Dict[str, "SentenceTransformer"] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def _get_embedder(name: str = _EMBEDDING_MODEL) -> "SentenceTransformer":
+    """Общий экземпляр модели эмбеддингов (загружается один раз)"""
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(name)
+        if model is None:
+            model = SentenceTransformer(name)
+            model.eval()
+            _MODEL_CACHE[name] = model
+        return model
+
+
+class _SharedEmbeddingFunction:
+    """Функция эмбеддингов ChromaDB поверх общей модели"""
+    
+    def __init__(self, model: "SentenceTransformer"):
+        self._model = model
+    
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self._model.encode(list(input), normalize_embeddings=True).tolist()
+
+
 class KnowledgeBase:
     """Класс для работы с базой знаний"""
     
@@ -46,6 +264,24 @@ class KnowledgeBase:
         self.db_path = db_path
         self.chroma_path = chroma_path
         self.vector_store = None
+        self.faiss_index = None
+        self.faiss_path = os.path.splitext(db_path)[0] + ".faiss"
+        self._faiss_lock = threading.Lock()
+        
+        # Соединения SQLite живут все время работы, по одному на поток
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._fts_available = False
+        
+        # Модель эмбеддингов загружается вместе с векторным хранилищем
+        self._embedder = None
+        self._embed_query = functools.lru_cache(maxsize=_QUERY_EMBEDDING_CACHE_SIZE)(
+            self._encode_query
+        )
+        # (запрос, тип приложения, лимит) -> (момент устаревания, ID решений)
+        self._search_cache: OrderedDict = OrderedDict()
+        self._search_cache_lock = threading.Lock()
         
         # Инициализация базы данных
         self._init_database()
@@ -53,11 +289,56 @@ class KnowledgeBase:
         # Инициализация векторного хранилища
         if CHROMA_AVAILABLE and SENTENCE_TRANSFORMERS_AVAILABLE:
             self._init_vector_store()
+        
+        # Без ChromaDB семантический поиск идет через локальный индекс Faiss
+        if not self.vector_store and FAISS_AVAILABLE and SENTENCE_TRANSFORMERS_AVAILABLE:
+            self._init_faiss_index()
+        
+        # Векторный поиск идет в отдельном потоке параллельно с текстовым
+        self._search_pool = None
+        if self.vector_store or self.faiss_index is not None:
+            self._search_pool = ThreadPoolExecutor(
+                max_workers=_SEARCH_WORKERS, thread_name_prefix="kb-vector-search"
+            )
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        """
+        Постоянное соединение текущего потока
+        
+        Используется как `with self._get_conn() as conn:` - блок with
+        завершает транзакцию, но не закрывает соединение.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, cached_statements=_CACHED_STATEMENTS
+            )
+            # Доступ к колонкам по имени на уровне C
+            conn.row_factory = sqlite3.Row
+            for pragma in _PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self):
+        """Закрытие всех соединений с базой данных"""
+        if self._search_pool is not None:
+            self._search_pool.shutdown(wait=True)
+            self._search_pool = None
+        
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        # Соединения других потоков будут пересозданы при следующем обращении
+        self._local = threading.local()
     
     def _init_database(self):
         """Инициализация SQLite базы данных"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
                 
                 # Создание таблицы решений
@@ -81,21 +362,79 @@ class KnowledgeBase:
                     CREATE INDEX IF NOT EXISTS idx_error_text 
                     ON solutions(error_text)
                 ''')
+                # Составные индексы: фильтр по типу/категории сразу отдает
+                # строки в порядке рейтинга, без отдельной сортировки
                 cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_application_type 
-                    ON solutions(application_type)
+                    CREATE INDEX IF NOT EXISTS idx_app_rate 
+                    ON solutions(application_type, success_rate DESC)
                 ''')
                 cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_error_category 
-                    ON solutions(error_category)
+                    CREATE INDEX IF NOT EXISTS idx_cat_rate 
+                    ON solutions(error_category, success_rate DESC)
                 ''')
+                # Покрывающий индекс для статистики (без чтения строк таблицы)
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_stats 
+                    ON solutions(application_type, error_category, success_rate)
+                ''')
+                # Одноколоночные индексы - префиксы составных
+                cursor.execute('DROP INDEX IF EXISTS idx_application_type')
+                cursor.execute('DROP INDEX IF EXISTS idx_error_category')
+                
+                self._migrate_schema(cursor)
+                
+                conn.commit()
                 
+                # Статистика для планировщика: полный ANALYZE один раз,
+                # дальше SQLite обновляет ее сам, когда она устаревает
+                analyzed = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+                ).fetchone()
+                cursor.execute('PRAGMA optimize' if analyzed else 'ANALYZE')
                 conn.commit()
+                
+                self._init_fts(conn)
                 logger.info("База данных инициализирована успешно")
                 
         except Exception as e:
             logger.error(f"Ошибка инициализации базы данных: {e}")
     
+    @staticmethod
+    def _migrate_schema(cursor: sqlite3.Cursor):
+        """Обновление схемы существующей базы (версия в PRAGMA user_version)"""
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        
+        if version < 1:
+            # Теги: JSON-массив -> строка через запятую
+            cursor.execute('''
+                UPDATE solutions
+                SET tags = (SELECT group_concat(value, ',') FROM json_each(solutions.tags))
+                WHERE json_valid(tags) AND json_type(tags) = 'array'
+            ''')
+        
+        if version < _SCHEMA_VERSION:
+            cursor.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+    
+    def _init_fts(self, conn: sqlite3.Connection):
+        """Создание полнотекстового индекса FTS5 (если SQLite собран с ним)"""
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'solutions_fts'"
+            ).fetchone()
+            
+            with conn:
+                if not exists:
+                    conn.execute(_FTS_SCHEMA[0])
+                    # Индексация решений, добавленных до появления FTS
+                    conn.execute("INSERT INTO solutions_fts(solutions_fts) VALUES ('rebuild')")
+                for trigger in _FTS_SCHEMA[1:]:
+                    conn.execute(trigger)
+            
+            self._fts_available = True
+            
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 недоступен, используется поиск LIKE: {e}")
+    
     def _init_vector_store(self):
         """Инициализация векторного хранилища"""
         try:
@@ -108,16 +447,152 @@ class KnowledgeBase:
                 settings=Settings(anonymized_telemetry=False)
             )
             
+            # Одна модель и для документов (внутри ChromaDB), и для запросов
+            self._embedder = _get_embedder()
+            
             # Создание коллекции
+            with self._get_conn() as conn:
+                vector_count = conn.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
             self.collection = self.vector_store.get_or_create_collection(
                 name="solutions",
-                metadata={"hnsw:space": "cosine"}
+                metadata=self._hnsw_metadata(vector_count),
+                embedding_function=_SharedEmbeddingFunction(self._embedder)
             )
             
             logger.info("Векторное хранилище инициализировано успешно")
             
         except Exception as e:
             logger.error(f"Ошибка инициализации векторного хранилища: {e}")
+            self.vector_store = None
+    
+    @staticmethod
+    def _hnsw_metadata(vector_count: int) -> Dict[str, object]:
+        """
+        Метаданные коллекции с параметрами HNSW
+        
+        search_ef подбирается по числу решений: на малой базе узкий поиск
+        уже дает почти точный результат, на большой нужен более широкий.
+        """
+        search_ef = _HNSW_SEARCH_EF_MAX
+        for max_count, tier_ef in _HNSW_SEARCH_EF_TIERS:
+            if vector_count < max_count:
+                search_ef = tier_ef
+                break
+        
+        return {
+            "hnsw:space": "cosine",
+            "hnsw:M": _HNSW_M,
+            "hnsw:construction_ef": _HNSW_CONSTRUCTION_EF,
+            "hnsw:search_ef": search_ef,
+            "hnsw:num_threads": os.cpu_count() or 1,
+        }
+    
+    def _encode_query(self, text: str) -> Tuple[float, ...]:
+        """Нормализованный эмбеддинг запроса (кэшируется через _embed_query)"""
+        return tuple(self._embedder.encode(text, normalize_embeddings=True).tolist())
+    
+    def _get_cached_ids(self, key: Tuple) -> Optional[List[int]]:
+        """ID решений из кэша поиска, если запись не устарела"""
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, solution_ids = entry
+            if expires_at < time.monotonic():
+                del self._search_cache[key]
+                return None
+            self._search_cache.move_to_end(key)
+            return solution_ids
+    
+    def _cache_ids(self, key: Tuple, solution_ids: List[int]):
+        """Сохранение ID решений в кэш поиска"""
+        with self._search_cache_lock:
+            self._search_cache[key] = (time.monotonic() + _SEARCH_CACHE_TTL, solution_ids)
+            self._search_cache.move_to_end(key)
+            if len(self._search_cache) > _SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+    
+    def _invalidate_search_cache(self):
+        """Сброс кэша поиска после изменения набора решений"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+    
+    def _init_faiss_index(self):
+        """Загрузка индекса Faiss с диска или построение по всем решениям"""
+        try:
+            self._embedder = _get_embedder()
+            
+            if os.path.exists(self.faiss_path):
+                self.faiss_index = faiss.read_index(self.faiss_path)
+            else:
+                with self._get_conn() as conn:
+                    rows = conn.execute(_SELECT_ALL_SOLUTIONS_SQL).fetchall()
+                solutions = [self._row_to_solution(row) for row in rows]
+                
+                if solutions:
+                    vectors = self._embed([self._faiss_text(s) for s in solutions])
+                    ids = np.array([s.id for s in solutions], dtype=np.int64)
+                    self.faiss_index = self._create_faiss_index(vectors)
+                    self.faiss_index.add_with_ids(vectors, ids)
+                else:
+                    self.faiss_index = self._create_faiss_index(None)
+                faiss.write_index(self.faiss_index, self.faiss_path)
+            
+            if hasattr(self.faiss_index, "nprobe"):
+                self.faiss_index.nprobe = _FAISS_NPROBE
+            
+            logger.info(f"Индекс Faiss загружен: {self.faiss_index.ntotal} векторов")
+            
+        except Exception as e:
+            logger.error(f"Ошибка инициализации индекса Faiss: {e}")
+            self.faiss_index = None
+    
+    def _create_faiss_index(self, vectors: Optional["np.ndarray"]):
+        """
+        Создание индекса: IVF для большой базы, полный перебор для малой
+        
+        Векторы хранятся квантованными: fp16 для полного перебора (не требует
+        обучения) и int8 в IVF, где квантизатор обучается вместе с кластерами.
+        Это в 2-4 раза сокращает объем данных, читаемых при поиске.
+        """
+        dim = self._embedder.get_sentence_embedding_dimension()
+        
+        # Эмбеддинги нормализованы, скалярное произведение = косинусная близость
+        if vectors is None or len(vectors) < _FAISS_IVF_MIN_SIZE:
+            return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(
+                dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            ))
+        
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dim, _FAISS_NLIST, faiss.ScalarQuantizer.QT_8bit,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        return index
+    
+    def _embed(self, texts: List[str]) -> "np.ndarray":
+        """Нормализованные эмбеддинги в формате Faiss (float32, C-порядок)"""
+        vectors = self._embedder.encode(texts, normalize_embeddings=True)
+        return np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+    
+    @staticmethod
+    def _faiss_text(solution: Solution) -> str:
+        """Текст решения для индекса Faiss"""
+        return f"{solution.error_text} {' '.join(solution.tags)}"
+    
+    def _add_to_faiss_index(self, solution_ids: List[int], solutions: List[Solution]):
+        """Добавление решений в индекс Faiss с сохранением на диск"""
+        try:
+            vectors = self._embed([self._faiss_text(s) for s in solutions])
+            ids = np.array(solution_ids, dtype=np.int64)
+            
+            with self._faiss_lock:
+                self.faiss_index.add_with_ids(vectors, ids)
+                faiss.write_index(self.faiss_index, self.faiss_path)
+                
+        except Exception as e:
+            logger.error(f"Ошибка добавления в индекс Faiss: {e}")
     
     def add_solution(self, solution: Solution) -> bool:
         """
@@ -130,32 +605,20 @@ class KnowledgeBase:
             True если добавление успешно
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    INSERT INTO solutions 
-                    (error_text, solution_text, application_type, error_category, 
-                     source, success_rate, created_at, tags, steps)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    solution.error_text,
-                    solution.solution_text,
-                    solution.application_type,
-                    solution.error_category,
-                    solution.source,
-                    solution.success_rate,
-                    solution.created_at,
-                    json.dumps(solution.tags),
-                    json.dumps(solution.steps)
-                ))
+                cursor.execute(_INSERT_SOLUTION_SQL, self._solution_params(solution))
                 
                 solution_id = cursor.lastrowid
                 conn.commit()
                 
                 # Добавление в векторное хранилище
                 if self.vector_store:
-                    self._add_to_vector_store(solution_id, solution)
+                    self._add_to_vector_store([solution_id], [solution])
+                elif self.faiss_index is not None:
+                    self._add_to_faiss_index([solution_id], [solution])
+                self._invalidate_search_cache()
                 
                 logger.info(f"Решение добавлено с ID: {solution_id}")
                 return True
@@ -164,23 +627,94 @@ class KnowledgeBase:
             logger.error(f"Ошибка добавления решения: {e}")
             return False
     
-    def _add_to_vector_store(self, solution_id: int, solution: Solution):
-        """Добавление решения в векторное хранилище"""
+    def add_solutions_bulk(self, solutions: List[Solution]) -> int:
+        """
+        Добавление набора решений одной транзакцией
+        
+        Args:
+            solutions: Список решений
+            
+        Returns:
+            Количество добавленных решений
+        """
+        if not solutions:
+            return 0
+        
         try:
-            # Создание эмбеддинга для поиска
-            search_text = f"{solution.error_text} {solution.application_type} {solution.error_category}"
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                
+                # Один COMMIT (и fsync) на весь набор вместо одного на решение
+                cursor.executemany(
+                    _INSERT_SOLUTION_SQL, map(self._solution_params, solutions)
+                )
+                # Транзакция держит блокировку записи, поэтому AUTOINCREMENT
+                # выдает идущие подряд ID, заканчивающиеся на последнем
+                last_id = cursor.execute('SELECT last_insert_rowid()').fetchone()[0]
+                solution_ids = list(range(last_id - len(solutions) + 1, last_id + 1))
+                conn.commit()
             
-            # Добавление в коллекцию
-            self.collection.add(
-                documents=[search_text],
-                metadatas=[{
-                    "solution_id": solution_id,
-                    "application_type": solution.application_type,
-                    "error_category": solution.error_category,
-                    "source": solution.source
-                }],
-                ids=[str(solution_id)]
-            )
+            # Добавление в векторное хранилище
+            if self.vector_store:
+                self._add_to_vector_store(solution_ids, solutions)
+            elif self.faiss_index is not None:
+                self._add_to_faiss_index(solution_ids, solutions)
+            self._invalidate_search_cache()
+            
+            logger.info(f"Добавлено решений: {len(solution_ids)}")
+            return len(solution_ids)
+            
+        except Exception as e:
+            logger.error(f"Ошибка пакетного добавления решений: {e}")
+            return 0
+    
+    @staticmethod
+    def _solution_params(solution: Solution) -> Tuple:
+        """Параметры INSERT для решения"""
+        return (
+            solution.error_text,
+            solution.solution_text,
+            solution.application_type,
+            solution.error_category,
+            solution.source,
+            solution.success_rate,
+            solution.created_at,
+            # Теги - плоский список коротких строк, JSON для них не нужен
+            ",".join(solution.tags),
+            _json_text(solution.steps)
+        )
+    
+    def _add_to_vector_store(self, solution_ids: List[int], solutions: List[Solution]):
+        """
+        Добавление решений в векторное хранилище
+        
+        Решения передаются в ChromaDB пакетами, чтобы модель эмбеддингов
+        кодировала сразу несколько текстов за один проход.
+        """
+        try:
+            for start in range(0, len(solutions), _VECTOR_BATCH_SIZE):
+                batch_ids = solution_ids[start:start + _VECTOR_BATCH_SIZE]
+                batch = solutions[start:start + _VECTOR_BATCH_SIZE]
+                
+                documents = [
+                    f"{s.error_text} {s.application_type} {s.error_category}"
+                    for s in batch
+                ]
+                # Эмбеддинги считаются заранее одним вызовом модели;
+                # upsert не падает на ID, уже добавленных до сбоя
+                self.collection.upsert(
+                    embeddings=self._embedder.encode(
+                        documents, normalize_embeddings=True
+                    ).tolist(),
+                    documents=documents,
+                    metadatas=[{
+                        "solution_id": solution_id,
+                        "application_type": s.application_type,
+                        "error_category": s.error_category,
+                        "source": s.source
+                    } for solution_id, s in zip(batch_ids, batch)],
+                    ids=[str(solution_id) for solution_id in batch_ids]
+                )
             
         except Exception as e:
             logger.error(f"Ошибка добавления в векторное хранилище: {e}")
@@ -198,130 +732,223 @@ class KnowledgeBase:
         Returns:
             Список найденных решений
         """
-        solutions = []
-        
-        # Векторный поиск (если доступен)
+        # Векторный поиск (если доступен) запускается в пуле: он занят
+        # эмбеддингом и обходом графа, пока текущий поток ждет SQLite
+        vector_search = None
         if self.vector_store:
-            vector_results = self._vector_search(query, application_type, limit)
-            solutions.extend(vector_results)
+            vector_search = self._vector_search
+        elif self.faiss_index is not None:
+            vector_search = self._faiss_search
+        
+        vector_future = None
+        if vector_search is not None and self._search_pool is not None:
+            vector_future = self._search_pool.submit(
+                vector_search, query, application_type, limit
+            )
         
         # Текстовый поиск в SQLite
-        text_results = self._text_search(query, application_type, limit)
-        solutions.extend(text_results)
+        ranked_lists = [self._text_search(query, application_type, limit)]
         
-        # Удаление дубликатов и сортировка по релевантности
-        unique_solutions = self._deduplicate_solutions(solutions)
-        return unique_solutions[:limit]
+        if vector_future is not None:
+            ranked_lists.insert(0, vector_future.result())
+        elif vector_search is not None:
+            ranked_lists.insert(0, vector_search(query, application_type, limit))
+        
+        # Объединение по Reciprocal Rank Fusion: решение, найденное обоими
+        # способами, поднимается выше; повторы схлопываются в словаре
+        scores: Dict[int, float] = {}
+        for solution_ids in ranked_lists:
+            for rank, solution_id in enumerate(solution_ids):
+                scores[solution_id] = scores.get(solution_id, 0.0) + 1.0 / (_RRF_K + rank)
+        
+        top_ids = heapq.nlargest(limit, scores, key=scores.__getitem__)
+        
+        # Одно обращение к SQLite за строками, порядок - по итоговому рангу
+        return self._get_solutions_by_ids(top_ids)
     
     def _vector_search(self, query: str, application_type: str = None, 
-                      limit: int = 10) -> List[Solution]:
-        """Векторный поиск"""
+                      limit: int = 10) -> List[int]:
+        """Векторный поиск, возвращает ID решений по убыванию близости"""
         try:
             # Построение запроса
             search_query = query
             if application_type:
                 search_query += f" {application_type}"
             
-            # Поиск в векторном хранилище
-            results = self.collection.query(
-                query_texts=[search_query],
-                n_results=limit,
-                where={"application_type": application_type} if application_type else None
-            )
+            key = ("chroma", search_query, application_type, limit)
+            solution_ids = self._get_cached_ids(key)
             
-            # Получение решений из SQLite по ID
-            solution_ids = [int(id) for id in results['ids'][0]]
-            return self._get_solutions_by_ids(solution_ids)
+            if solution_ids is None:
+                # Поиск в векторном хранилище
+                results = self.collection.query(
+                    query_embeddings=[list(self._embed_query(search_query))],
+                    n_results=limit,
+                    where={"application_type": application_type} if application_type else None
+                )
+                solution_ids = [int(id) for id in results['ids'][0]]
+                self._cache_ids(key, solution_ids)
+            
+            return solution_ids
             
         except Exception as e:
             logger.error(f"Ошибка векторного поиска: {e}")
             return []
     
+    def _faiss_search(self, query: str, application_type: str = None,
+                      limit: int = 10) -> List[int]:
+        """Семантический поиск по индексу Faiss, возвращает ID решений"""
+        try:
+            key = ("faiss", query, application_type, limit)
+            solution_ids = self._get_cached_ids(key)
+            
+            if solution_ids is None:
+                # С фильтром по приложению берем кандидатов с запасом
+                k = limit * 4 if application_type else limit
+                vector = np.array([self._embed_query(query)], dtype=np.float32)
+                
+                with self._faiss_lock:
+                    _, found = self.faiss_index.search(vector, k)
+                
+                # -1 означает, что кандидатов меньше k
+                solution_ids = [int(i) for i in found[0] if i != -1]
+                self._cache_ids(key, solution_ids)
+            
+            if application_type:
+                solution_ids = self._filter_by_application(solution_ids, application_type)
+            return solution_ids[:limit]
+            
+        except Exception as e:
+            logger.error(f"Ошибка поиска в индексе Faiss: {e}")
+            return []
+    
+    def _filter_by_application(self, solution_ids: List[int],
+                               application_type: str) -> List[int]:
+        """Отбор ID решений для заданного типа приложения с сохранением порядка"""
+        if not solution_ids:
+            return []
+        
+        with self._get_conn() as conn:
+            placeholders = ','.join('?' * len(solution_ids))
+            matched = {row[0] for row in conn.execute(
+                f'SELECT id FROM solutions WHERE id IN ({placeholders}) AND application_type = ?',
+                (*solution_ids, application_type)
+            )}
+        return [i for i in solution_ids if i in matched]
+    
     def _text_search(self, query: str, application_type: str = None, 
-                    limit: int = 10) -> List[Solution]:
-        """Текстовый поиск в SQLite"""
+                    limit: int = 10) -> List[int]:
+        """Текстовый поиск в SQLite, возвращает ID решений по убыванию релевантности"""
+        if not self._fts_available:
+            return self._like_search(query, application_type, limit)
+        
+        match = self._fts_query(query)
+        if not match:
+            return []
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
                 
-                # Построение SQL запроса
-                sql = '''
-                    SELECT * FROM solutions 
-                    WHERE error_text LIKE ? OR solution_text LIKE ?
-                '''
-                params = [f"%{query}%", f"%{query}%"]
-                
+                # Поиск по инвертированному индексу с ранжированием BM25
                 if application_type:
-                    sql += " AND application_type = ?"
-                    params.append(application_type)
-                
-                sql += " ORDER BY success_rate DESC LIMIT ?"
-                params.append(limit)
+                    cursor.execute(_FTS_SEARCH_APP_SQL, (match, application_type, limit))
+                else:
+                    cursor.execute(_FTS_SEARCH_SQL, (match, limit))
+                return [row[0] for row in cursor.fetchall()]
                 
-                cursor.execute(sql, params)
-                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка текстового поиска: {e}")
+            return []
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """
+        Запрос FTS5 из произвольного текста
+        
+        Слова запроса ищутся как фраза, последнее - по префиксу, что
+        ближе всего к прежнему поиску подстроки через LIKE. Кавычки
+        исключают разбор операторов FTS5 из пользовательского текста.
+        """
+        words = _WORD_RE.findall(query)
+        if not words:
+            return ""
+        return '"' + " ".join(words) + '"*'
+    
+    def _like_search(self, query: str, application_type: str = None,
+                     limit: int = 10) -> List[int]:
+        """Поиск подстроки через LIKE (без FTS5)"""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
                 
-                return [self._row_to_solution(row) for row in rows]
+                pattern = f"%{query}%"
+                if application_type:
+                    cursor.execute(_LIKE_SEARCH_APP_SQL, (pattern, pattern, application_type, limit))
+                else:
+                    cursor.execute(_LIKE_SEARCH_SQL, (pattern, pattern, limit))
+                return [row[0] for row in cursor.fetchall()]
                 
         except Exception as e:
             logger.error(f"Ошибка текстового поиска: {e}")
             return []
     
     def _get_solutions_by_ids(self, solution_ids: List[int]) -> List[Solution]:
-        """Получение решений по ID"""
+        """Получение решений по ID в порядке переданного списка"""
         if not solution_ids:
             return []
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
+                solutions = []
                 
-                placeholders = ','.join(['?' for _ in solution_ids])
-                cursor.execute(f'''
-                    SELECT * FROM solutions 
-                    WHERE id IN ({placeholders})
-                ''', solution_ids)
+                # Ранг передается вместе с ID, и SQLite сам возвращает строки
+                # в порядке ранжирования поиска
+                for start in range(0, len(solution_ids), _MAX_SQL_VARIABLES):
+                    chunk = solution_ids[start:start + _MAX_SQL_VARIABLES]
+                    sql, size = _solutions_by_ids_sql(len(chunk))
+                    # Лишние позиции заполняются NULL, который ни с чем не совпадает
+                    params = chunk + [None] * (size - len(chunk))
+                    cursor.execute(sql, params)
+                    solutions.extend(self._row_to_solution(row) for row in cursor)
                 
-                rows = cursor.fetchall()
-                return [self._row_to_solution(row) for row in rows]
+                return solutions
                 
         except Exception as e:
             logger.error(f"Ошибка получения решений по ID: {e}")
             return []
     
-    def _row_to_solution(self, row: Tuple) -> Solution:
+    def _row_to_solution(self, row: sqlite3.Row) -> Solution:
         """Преобразование строки БД в объект Solution"""
+        tags = row['tags']
+        steps = row['steps']
         return Solution(
-            id=row[0],
-            error_text=row[1],
-            solution_text=row[2],
-            application_type=row[3],
-            error_category=row[4],
-            source=row[5],
-            success_rate=row[6],
-            created_at=row[7],
-            tags=json.loads(row[8]) if row[8] else [],
-            steps=json.loads(row[9]) if row[9] else []
+            id=row['id'],
+            error_text=row['error_text'],
+            solution_text=row['solution_text'],
+            application_type=row['application_type'],
+            error_category=row['error_category'],
+            source=row['source'],
+            success_rate=row['success_rate'],
+            created_at=row['created_at'],
+            tags=tags.split(',') if tags else [],
+            steps=_json_loads(steps) if steps else []
         )
     
-    def _deduplicate_solutions(self, solutions: List[Solution]) -> List[Solution]:
-        """Удаление дубликатов решений"""
-        seen_ids = set()
-        unique_solutions = []
-        
-        for solution in solutions:
-            if solution.id not in seen_ids:
-                seen_ids.add(solution.id)
-                unique_solutions.append(solution)
-        
-        return unique_solutions
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, object]:
+        """Преобразование строки БД в словарь для экспорта (без Solution)"""
+        data = dict(row)
+        data['tags'] = data['tags'].split(',') if data['tags'] else []
+        data['steps'] = _json_loads(data['steps']) if data['steps'] else []
+        return data
     
     def get_solution_by_id(self, solution_id: int) -> Optional[Solution]:
         """Получение решения по ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT * FROM solutions WHERE id = ?', (solution_id,))
+                cursor.execute(_SELECT_SOLUTION_SQL, (solution_id,))
                 row = cursor.fetchone()
                 
                 if row:
@@ -335,13 +962,9 @@ class KnowledgeBase:
     def update_success_rate(self, solution_id: int, success_rate: float) -> bool:
         """Обновление рейтинга успешности решения"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE solutions 
-                    SET success_rate = ? 
-                    WHERE id = ?
-                ''', (success_rate, solution_id))
+                cursor.execute(_UPDATE_SUCCESS_RATE_SQL, (success_rate, solution_id))
                 conn.commit()
                 return True
                 
@@ -352,32 +975,25 @@ class KnowledgeBase:
     def get_statistics(self) -> Dict[str, any]:
         """Получение статистики базы знаний"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
                 
-                # Общее количество решений
-                cursor.execute('SELECT COUNT(*) FROM solutions')
-                total_solutions = cursor.fetchone()[0]
-                
-                # Количество по типам приложений
-                cursor.execute('''
-                    SELECT application_type, COUNT(*) 
-                    FROM solutions 
-                    GROUP BY application_type
-                ''')
-                app_stats = dict(cursor.fetchall())
-                
-                # Количество по категориям ошибок
-                cursor.execute('''
-                    SELECT error_category, COUNT(*) 
-                    FROM solutions 
-                    GROUP BY error_category
-                ''')
-                category_stats = dict(cursor.fetchall())
+                # Все счетчики одним запросом; группировки идут по
+                # покрывающим индексам, AVG пропускает NULL сам
+                cursor.execute(_STATISTICS_SQL)
                 
-                # Средний рейтинг успешности
-                cursor.execute('SELECT AVG(success_rate) FROM solutions WHERE success_rate IS NOT NULL')
-                avg_success_rate = cursor.fetchone()[0] or 0
+                total_solutions = 0
+                avg_success_rate = 0
+                app_stats = {}
+                category_stats = {}
+                for kind, key, count, avg in cursor:
+                    if kind == 'app':
+                        app_stats[key] = count
+                    elif kind == 'cat':
+                        category_stats[key] = count
+                    else:
+                        total_solutions = count
+                        avg_success_rate = avg or 0
                 
                 return {
                     'total_solutions': total_solutions,
@@ -393,18 +1009,21 @@ class KnowledgeBase:
     def export_solutions(self, filepath: str) -> bool:
         """Экспорт решений в JSON файл"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._get_conn() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT * FROM solutions')
-                rows = cursor.fetchall()
+                cursor.execute(_SELECT_ALL_SOLUTIONS_SQL)
                 
-                solutions = [self._row_to_solution(row) for row in rows]
-                solutions_dict = [asdict(solution) for solution in solutions]
+                # Построчная запись: в памяти одна строка, а не вся таблица
+                count = 0
+                with open(filepath, 'wb') as f:
+                    f.write(b'[')
+                    for row in cursor:
+                        f.write(b',\n' if count else b'\n')
+                        f.write(_json_bytes(self._row_to_dict(row)))
+                        count += 1
+                    f.write(b'\n]\n')
                 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(solutions_dict, f, ensure_ascii=False, indent=2)
-                
-                logger.info(f"Экспортировано {len(solutions)} решений в {filepath}")
+                logger.info(f"Экспортировано {count} решений в {filepath}")
                 return True
                 
         except Exception as e:
@@ -414,11 +1033,12 @@ class KnowledgeBase:
     def import_solutions(self, filepath: str) -> bool:
         """Импорт решений из JSON файла"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                solutions_data = json.load(f)
+            with open(filepath, 'rb') as f:
+                solutions_data = _json_loads(f.read())
             
-            for solution_data in solutions_data:
-                solution = Solution(
+            created_at = datetime.now().isoformat()
+            solutions = [
+                Solution(
                     id=None,  # Будет установлен автоматически
                     error_text=solution_data['error_text'],
                     solution_text=solution_data['solution_text'],
@@ -426,13 +1046,18 @@ class KnowledgeBase:
                     error_category=solution_data['error_category'],
                     source=solution_data['source'],
                     success_rate=solution_data['success_rate'],
-                    created_at=datetime.now().isoformat(),
+                    created_at=created_at,
                     tags=solution_data.get('tags', []),
                     steps=solution_data.get('steps', [])
                 )
-                self.add_solution(solution)
+                for solution_data in solutions_data
+            ]
+            
+            imported = self.add_solutions_bulk(solutions)
+            if imported != len(solutions):
+                return False
             
-            logger.info(f"Импортировано {len(solutions_data)} решений из {filepath}")
+            logger.info(f"Импортировано {imported} решений из {filepath}")
             return True
             
         except Exception as e:
@@ -4,26 +4,165 @@
 
 import sqlite3
 import logging
-from typing import List, Dict, Optional
+import queue
+import re
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 import json
 
 logger = logging.getLogger(__name__)
 
+# Настройки каждого соединения: WAL не блокирует чтение во время записи,
+# synchronous=NORMAL делает fsync только при контрольных точках WAL
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA mmap_size=268435456",
+    # Заметки и теги удаляются вместе с записью (ON DELETE CASCADE)
+    "PRAGMA foreign_keys=ON",
+)
+
+# Версия схемы базы (хранится в PRAGMA user_version)
+_SCHEMA_VERSION = 1
+
+# Число соединений только для чтения (в WAL читатели не ждут писателя)
+_READ_POOL_SIZE = 4
+
+# Выражения горячих путей записи: одинаковый текст SQL при каждом вызове
+# попадает в кэш подготовленных выражений соединения
+_INSERT_HISTORY_SQL = """
+    INSERT INTO solution_history 
+    (error_text, error_type, application_type, solution_id, 
+     solution_title, solution_description, processing_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_UPDATE_FEEDBACK_SQL = """
+    UPDATE solution_history 
+    SET was_helpful = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+"""
+_INSERT_NOTE_SQL = "INSERT INTO user_notes (history_id, note_text) VALUES (?, ?)"
+_INSERT_TAG_SQL = "INSERT INTO history_tags (history_id, tag_name) VALUES (?, ?)"
+_DELETE_OLDER_SQL = "DELETE FROM solution_history WHERE created_at < datetime('now', ? || ' days')"
+
+# Дочерние таблицы записи истории и их текстовые колонки
+_CHILD_TABLES = (("user_notes", "note_text"), ("history_tags", "tag_name"))
+_CHILD_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        history_id INTEGER,
+        {column} TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (history_id) REFERENCES solution_history (id) ON DELETE CASCADE
+    )
+"""
+
+# Полнотекстовый индекс истории: тексты записи вместе с заметками и тегами.
+# Заметки и теги живут в отдельных таблицах, поэтому индекс хранит свою копию
+# текста и пересобирает строку записи триггерами при любом изменении
+_FTS_ROW_SQL = """
+    INSERT INTO solution_history_fts
+        (rowid, error_text, solution_title, solution_description, notes, tags)
+    SELECT h.id, h.error_text, h.solution_title, h.solution_description,
+           (SELECT GROUP_CONCAT(note_text, ' ') FROM user_notes WHERE history_id = h.id),
+           (SELECT GROUP_CONCAT(tag_name, ' ') FROM history_tags WHERE history_id = h.id)
+    FROM solution_history h
+"""
+_FTS_REFRESH = (
+    "DELETE FROM solution_history_fts WHERE rowid = {id}; "
+    + _FTS_ROW_SQL + " WHERE h.id = {id};"
+)
+_FTS_SCHEMA = (
+    """
+    CREATE VIRTUAL TABLE solution_history_fts USING fts5(
+        error_text, solution_title, solution_description, notes, tags,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    "CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON solution_history BEGIN "
+    + _FTS_ROW_SQL + " WHERE h.id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_au AFTER UPDATE OF "
+    "error_text, solution_title, solution_description ON solution_history BEGIN "
+    + _FTS_REFRESH.format(id="new.id") + " END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_ad AFTER DELETE ON solution_history BEGIN "
+    "DELETE FROM solution_history_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_notes_ai AFTER INSERT ON user_notes BEGIN "
+    + _FTS_REFRESH.format(id="new.history_id") + " END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_notes_ad AFTER DELETE ON user_notes BEGIN "
+    + _FTS_REFRESH.format(id="old.history_id") + " END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_tags_ai AFTER INSERT ON history_tags BEGIN "
+    + _FTS_REFRESH.format(id="new.history_id") + " END",
+    "CREATE TRIGGER IF NOT EXISTS history_fts_tags_ad AFTER DELETE ON history_tags BEGIN "
+    + _FTS_REFRESH.format(id="old.history_id") + " END",
+)
+
+_WORD_RE = re.compile(r'\w+')
+
 class SolutionHistory:
     """Класс для ведения истории решенных проблем"""
     
     def __init__(self, db_path: str = "data/solution_history.db"):
         self.db_path = db_path
+        self._fts_available = False
         self._init_database()
+        
+        # Соединения живут все время работы: SQLite хранит разобранные
+        # выражения в кэше соединения и не готовит их заново на каждый вызов.
+        # Запись идет через одно соединение под блокировкой, чтение - через
+        # пул соединений только для чтения
+        self._conn = self._configure(sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=256
+        ))
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        
+        read_uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        self._ro_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(_READ_POOL_SIZE):
+            conn = self._configure(sqlite3.connect(
+                read_uri, uri=True, check_same_thread=False, cached_statements=256
+            ), read_only=True)
+            conn.row_factory = sqlite3.Row
+            self._ro_pool.put(conn)
+    
+    @staticmethod
+    def _configure(conn: sqlite3.Connection, read_only: bool = False) -> sqlite3.Connection:
+        """Применение PRAGMA к новому соединению"""
+        for pragma in _PRAGMAS:
+            # Режим журнала хранится в файле базы, его задает пишущее соединение
+            if read_only and pragma.startswith("PRAGMA journal_mode"):
+                continue
+            conn.execute(pragma)
+        return conn
+    
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Соединение только для чтения из пула"""
+        conn = self._ro_pool.get()
+        try:
+            yield conn
+        finally:
+            self._ro_pool.put(conn)
+    
+    def close(self):
+        """Закрытие соединений с базой данных"""
+        with self._lock:
+            self._conn.close()
+        for _ in range(_READ_POOL_SIZE):
+            self._ro_pool.get().close()
     
     def _init_database(self):
         """Инициализация базы данных истории"""
         try:
             Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._configure(sqlite3.connect(self.db_path)) as conn:
                 cursor = conn.cursor()
                 
                 # Таблица истории решений
@@ -43,40 +182,86 @@ class SolutionHistory:
                     )
                 """)
                 
-                # Таблица пользовательских заметок
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS user_notes (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        history_id INTEGER,
-                        note_text TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (history_id) REFERENCES solution_history (id)
-                    )
-                """)
-                
-                # Таблица тегов
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS history_tags (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        history_id INTEGER,
-                        tag_name TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (history_id) REFERENCES solution_history (id)
-                    )
-                """)
+                # Таблицы пользовательских заметок и тегов
+                for table, column in _CHILD_TABLES:
+                    cursor.execute(_CHILD_TABLE_SQL.format(table=table, column=column))
                 
                 # Индексы для производительности
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_error_type ON solution_history (error_type)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_application_type ON solution_history (application_type)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON solution_history (created_at)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_was_helpful ON solution_history (was_helpful)")
+                # Фильтры и сортировка get_history одним индексом: при равенстве по
+                # фильтрам записи уже упорядочены по (created_at, id), обратный проход
+                # по индексу дает порядок страницы без сортировки
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_hist_filter_sort ON solution_history
+                    (error_type, application_type, was_helpful, created_at)
+                """)
                 
                 conn.commit()
+                
+                self._migrate_schema(conn)
+                self._init_fts(conn)
                 logger.info("База данных истории решений инициализирована")
                 
         except Exception as e:
             logger.error(f"Ошибка инициализации базы данных истории: {e}")
     
+    @staticmethod
+    def _migrate_schema(conn: sqlite3.Connection):
+        """Обновление схемы существующей базы (версия в PRAGMA user_version)"""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        
+        if version < 1:
+            # Внешние ключи заметок и тегов получают ON DELETE CASCADE.
+            # Ограничения таблицы в SQLite не изменить, поэтому таблицы
+            # пересоздаются; строки без записи истории при этом отбрасываются.
+            # Триггеры FTS ссылаются на эти таблицы - их заново создаст _init_fts
+            with conn:
+                conn.execute("BEGIN")
+                for (trigger,) in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'history_fts_%'"
+                ).fetchall():
+                    conn.execute(f"DROP TRIGGER {trigger}")
+                
+                for table, column in _CHILD_TABLES:
+                    cascades = any(
+                        row[6] == "CASCADE" for row in conn.execute(f"PRAGMA foreign_key_list({table})")
+                    )
+                    if cascades:
+                        continue
+                    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+                    conn.execute(_CHILD_TABLE_SQL.format(table=table, column=column))
+                    conn.execute(f"""
+                        INSERT INTO {table} (id, history_id, {column}, created_at)
+                        SELECT id, history_id, {column}, created_at FROM {table}_old
+                        WHERE history_id IN (SELECT id FROM solution_history)
+                    """)
+                    conn.execute(f"DROP TABLE {table}_old")
+                
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+    
+    def _init_fts(self, conn: sqlite3.Connection):
+        """Создание полнотекстового индекса FTS5 (если SQLite собран с ним)"""
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'solution_history_fts'"
+            ).fetchone()
+            
+            with conn:
+                if not exists:
+                    conn.execute(_FTS_SCHEMA[0])
+                    # Индексация записей, добавленных до появления FTS
+                    conn.execute(_FTS_ROW_SQL)
+                for trigger in _FTS_SCHEMA[1:]:
+                    conn.execute(trigger)
+            
+            self._fts_available = True
+            
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 недоступен, поиск в истории через LIKE: {e}")
+    
     def add_solution_record(self, error_text: str, error_type: str, application_type: str,
                            solution_id: Optional[int] = None, solution_title: str = "",
                            solution_description: str = "", processing_time: float = 0.0) -> int:
@@ -96,16 +281,13 @@ class SolutionHistory:
             ID созданной записи
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._lock, self._conn as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    INSERT INTO solution_history 
-                    (error_text, error_type, application_type, solution_id, 
-                     solution_title, solution_description, processing_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (error_text, error_type, application_type, solution_id,
-                      solution_title, solution_description, processing_time))
+                cursor.execute(_INSERT_HISTORY_SQL, (
+                    error_text, error_type, application_type, solution_id,
+                    solution_title, solution_description, processing_time
+                ))
                 
                 record_id = cursor.lastrowid
                 conn.commit()
@@ -117,6 +299,38 @@ class SolutionHistory:
             logger.error(f"Ошибка добавления записи в историю: {e}")
             return -1
     
+    def add_solution_records(self, records: Iterable[Tuple]) -> List[int]:
+        """
+        Добавление набора записей о решениях одной транзакцией
+        
+        Args:
+            records: Кортежи (error_text, error_type, application_type, solution_id,
+                solution_title, solution_description, processing_time)
+            
+        Returns:
+            ID созданных записей
+        """
+        records = list(records)
+        if not records:
+            return []
+        
+        try:
+            with self._lock, self._conn as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany(_INSERT_HISTORY_SQL, records)
+                
+                # Транзакция держит блокировку записи, ID идут подряд
+                last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+                record_ids = list(range(last_id - len(records) + 1, last_id + 1))
+                
+                logger.info(f"Добавлено записей в историю: {len(record_ids)}")
+                return record_ids
+                
+        except Exception as e:
+            logger.error(f"Ошибка пакетного добавления записей в историю: {e}")
+            return []
+    
     def update_solution_feedback(self, record_id: int, was_helpful: bool) -> bool:
         """
         Обновление обратной связи по решению
@@ -129,14 +343,10 @@ class SolutionHistory:
             True если успешно
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._lock, self._conn as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    UPDATE solution_history 
-                    SET was_helpful = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """, (was_helpful, record_id))
+                cursor.execute(_UPDATE_FEEDBACK_SQL, (was_helpful, record_id))
                 
                 conn.commit()
                 logger.info(f"Обновлена обратная связь для записи {record_id}")
@@ -158,13 +368,10 @@ class SolutionHistory:
             True если успешно
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._lock, self._conn as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    INSERT INTO user_notes (history_id, note_text)
-                    VALUES (?, ?)
-                """, (history_id, note_text))
+                cursor.execute(_INSERT_NOTE_SQL, (history_id, note_text))
                 
                 conn.commit()
                 logger.info(f"Добавлена заметка для записи {history_id}")
@@ -186,13 +393,10 @@ class SolutionHistory:
             True если успешно
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._lock, self._conn as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute("""
-                    INSERT INTO history_tags (history_id, tag_name)
-                    VALUES (?, ?)
-                """, (history_id, tag_name))
+                cursor.execute(_INSERT_TAG_SQL, (history_id, tag_name))
                 
                 conn.commit()
                 logger.info(f"Добавлен тег '{tag_name}' для записи {history_id}")
@@ -202,9 +406,60 @@ class SolutionHistory:
             logger.error(f"Ошибка добавления тега: {e}")
             return False
     
+    def add_user_notes_bulk(self, history_id: int, note_texts: List[str]) -> int:
+        """
+        Добавление нескольких заметок к записи одной транзакцией
+        
+        Args:
+            history_id: ID записи истории
+            note_texts: Тексты заметок
+            
+        Returns:
+            Количество добавленных заметок
+        """
+        if not note_texts:
+            return 0
+        
+        try:
+            with self._lock, self._conn as conn:
+                conn.executemany(_INSERT_NOTE_SQL, [(history_id, note_text) for note_text in note_texts])
+                
+                logger.info(f"Добавлено заметок для записи {history_id}: {len(note_texts)}")
+                return len(note_texts)
+                
+        except Exception as e:
+            logger.error(f"Ошибка добавления заметок: {e}")
+            return 0
+    
+    def add_tags_bulk(self, history_id: int, tag_names: List[str]) -> int:
+        """
+        Добавление нескольких тегов к записи одной транзакцией
+        
+        Args:
+            history_id: ID записи истории
+            tag_names: Названия тегов
+            
+        Returns:
+            Количество добавленных тегов
+        """
+        if not tag_names:
+            return 0
+        
+        try:
+            with self._lock, self._conn as conn:
+                conn.executemany(_INSERT_TAG_SQL, [(history_id, tag_name) for tag_name in tag_names])
+                
+                logger.info(f"Добавлено тегов для записи {history_id}: {len(tag_names)}")
+                return len(tag_names)
+                
+        except Exception as e:
+            logger.error(f"Ошибка добавления тегов: {e}")
+            return 0
+    
     def get_history(self, limit: int = 50, offset: int = 0, 
                    error_type: str = None, application_type: str = None,
-                   was_helpful: bool = None) -> List[Dict]:
+                   was_helpful: bool = None,
+                   after: Optional[Tuple[str, int]] = None) -> List[Dict]:
         """
         Получение истории решений
         
@@ -214,23 +469,20 @@ class SolutionHistory:
             error_type: Фильтр по типу ошибки
             application_type: Фильтр по типу приложения
             was_helpful: Фильтр по полезности
+            after: (created_at, id) последней записи предыдущей страницы;
+                следующая страница начинается сразу после нее, без пропуска
+                offset строк
             
         Returns:
             Список записей истории
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 
-                query = """
-                    SELECT h.*, 
-                           GROUP_CONCAT(DISTINCT n.note_text) as notes,
-                           GROUP_CONCAT(DISTINCT t.tag_name) as tags
-                    FROM solution_history h
-                    LEFT JOIN user_notes n ON h.id = n.history_id
-                    LEFT JOIN history_tags t ON h.id = t.history_id
-                """
+                # Сначала страница записей, затем по одному запросу на заметки
+                # и теги: без соединения таблиц, которое перемножает строки
+                query = "SELECT h.* FROM solution_history h"
                 
                 conditions = []
                 params = []
@@ -247,21 +499,53 @@ class SolutionHistory:
                     conditions.append("h.was_helpful = ?")
                     params.append(was_helpful)
                 
+                if after is not None:
+                    conditions.append("(h.created_at, h.id) < (?, ?)")
+                    params.extend(after)
+                
                 if conditions:
                     query += " WHERE " + " AND ".join(conditions)
                 
-                query += " GROUP BY h.id ORDER BY h.created_at DESC LIMIT ? OFFSET ?"
+                query += " ORDER BY h.created_at DESC, h.id DESC LIMIT ? OFFSET ?"
                 params.extend([limit, offset])
                 
                 cursor.execute(query, params)
-                rows = cursor.fetchall()
+                records = [dict(row) for row in cursor.fetchall()]
                 
-                return [dict(row) for row in rows]
+                self._attach_notes_and_tags(cursor, records)
+                return records
                 
         except Exception as e:
             logger.error(f"Ошибка получения истории: {e}")
             return []
     
+    @staticmethod
+    def _attach_notes_and_tags(cursor: sqlite3.Cursor, records: List[Dict]):
+        """Добавление к записям полей notes и tags (через запятую, как GROUP_CONCAT)"""
+        if not records:
+            return
+        
+        record_ids = [record['id'] for record in records]
+        placeholders = ','.join('?' * len(record_ids))
+        
+        children = {}
+        for field, sql in (
+            ('notes', f"SELECT history_id, note_text FROM user_notes "
+                      f"WHERE history_id IN ({placeholders}) ORDER BY id"),
+            ('tags', f"SELECT history_id, tag_name FROM history_tags "
+                     f"WHERE history_id IN ({placeholders}) ORDER BY id"),
+        ):
+            # Словарь вместо множества: повторы убираются с сохранением порядка
+            by_id: Dict[int, Dict[str, None]] = {}
+            for history_id, text in cursor.execute(sql, record_ids):
+                by_id.setdefault(history_id, {})[text] = None
+            children[field] = by_id
+        
+        for record in records:
+            for field, by_id in children.items():
+                values = by_id.get(record['id'])
+                record[field] = ','.join(values) if values else None
+    
     def get_statistics(self) -> Dict:
         """
         Получение статистики истории
@@ -270,12 +554,19 @@ class SolutionHistory:
             Статистика истории
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 
-                # Общее количество записей
-                cursor.execute("SELECT COUNT(*) FROM solution_history")
-                total_records = cursor.fetchone()[0]
+                # Общие показатели за один проход по таблице
+                cursor.execute("""
+                    SELECT COUNT(*),
+                           SUM(CASE WHEN was_helpful = 1 THEN 1 ELSE 0 END),
+                           AVG(CASE WHEN processing_time > 0 THEN processing_time END)
+                    FROM solution_history
+                """)
+                total_records, helpful_solutions, avg_processing_time = cursor.fetchone()
+                helpful_solutions = helpful_solutions or 0
+                avg_processing_time = avg_processing_time or 0
                 
                 # Записи по типам ошибок
                 cursor.execute("""
@@ -293,22 +584,6 @@ class SolutionHistory:
                 """)
                 application_types = dict(cursor.fetchall())
                 
-                # Полезные решения
-                cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM solution_history 
-                    WHERE was_helpful = 1
-                """)
-                helpful_solutions = cursor.fetchone()[0]
-                
-                # Среднее время обработки
-                cursor.execute("""
-                    SELECT AVG(processing_time) 
-                    FROM solution_history 
-                    WHERE processing_time > 0
-                """)
-                avg_processing_time = cursor.fetchone()[0] or 0
-                
                 return {
                     'total_records': total_records,
                     'error_types': error_types,
@@ -322,19 +597,55 @@ class SolutionHistory:
             logger.error(f"Ошибка получения статистики: {e}")
             return {}
     
-    def search_history(self, query: str) -> List[Dict]:
+    def search_history(self, query: str, limit: Optional[int] = None) -> List[Dict]:
         """
         Поиск в истории
         
         Args:
             query: Поисковый запрос
+            limit: Максимальное количество записей (по умолчанию - все)
             
         Returns:
-            Список найденных записей
+            Список найденных записей (по убыванию релевантности)
         """
+        if not self._fts_available:
+            return self._like_search_history(query, limit)
+        
+        # Слова запроса ищутся как фраза, последнее - по префиксу;
+        # кавычки исключают разбор операторов FTS5 из текста пользователя
+        words = _WORD_RE.findall(query)
+        if not words:
+            return []
+        match = '"' + " ".join(words) + '"*'
+        
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    SELECT h.*, 
+                           (SELECT GROUP_CONCAT(DISTINCT note_text) FROM user_notes
+                            WHERE history_id = h.id) as notes,
+                           (SELECT GROUP_CONCAT(DISTINCT tag_name) FROM history_tags
+                            WHERE history_id = h.id) as tags
+                    FROM solution_history_fts f
+                    JOIN solution_history h ON h.id = f.rowid
+                    WHERE solution_history_fts MATCH ?
+                    ORDER BY bm25(solution_history_fts)
+                    LIMIT ?
+                """, (match, -1 if limit is None else limit))
+                
+                rows = cursor.fetchall()
+                return [dict(row) for row in rows]
+                
+        except Exception as e:
+            logger.error(f"Ошибка поиска в истории: {e}")
+            return []
+    
+    def _like_search_history(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """Поиск в истории через LIKE (без FTS5)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._reader() as conn:
                 cursor = conn.cursor()
                 
                 search_query = f"%{query}%"
@@ -353,7 +664,9 @@ class SolutionHistory:
                        OR t.tag_name LIKE ?
                     GROUP BY h.id
                     ORDER BY h.created_at DESC
-                """, (search_query, search_query, search_query, search_query, search_query))
+                    LIMIT ?
+                """, (search_query, search_query, search_query, search_query, search_query,
+                      -1 if limit is None else limit))
                 
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
@@ -362,6 +675,42 @@ class SolutionHistory:
             logger.error(f"Ошибка поиска в истории: {e}")
             return []
     
+    def iter_history(self, chunk: int = 1000) -> Iterator[Dict]:
+        """
+        Последовательный обход всей истории (от новых записей к старым)
+        
+        Записи читаются порциями по chunk штук с продолжением от последней
+        прочитанной (без OFFSET), соединение занято только на время порции.
+        
+        Args:
+            chunk: Размер порции
+            
+        Yields:
+            Записи истории с полями notes и tags
+        """
+        last_key = None
+        while True:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                if last_key is None:
+                    cursor.execute("""
+                        SELECT * FROM solution_history
+                        ORDER BY created_at DESC, id DESC LIMIT ?
+                    """, (chunk,))
+                else:
+                    cursor.execute("""
+                        SELECT * FROM solution_history
+                        WHERE (created_at, id) < (?, ?)
+                        ORDER BY created_at DESC, id DESC LIMIT ?
+                    """, (*last_key, chunk))
+                records = [dict(row) for row in cursor.fetchall()]
+                self._attach_notes_and_tags(cursor, records)
+            
+            yield from records
+            if len(records) < chunk:
+                return
+            last_key = (records[-1]['created_at'], records[-1]['id'])
+    
     def export_history(self, format: str = 'json') -> str:
         """
         Экспорт истории
@@ -373,21 +722,28 @@ class SolutionHistory:
             Путь к экспортированному файлу
         """
         try:
-            history = self.get_history(limit=10000)  # Все записи
+            # Записи пишутся в файл по мере чтения, вся история в памяти не держится
+            history = self.iter_history()
             
             if format == 'json':
                 export_path = f"data/history_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
                 with open(export_path, 'w', encoding='utf-8') as f:
-                    json.dump(history, f, ensure_ascii=False, indent=2)
+                    f.write('[')
+                    for index, record in enumerate(history):
+                        f.write(',\n' if index else '\n')
+                        f.write(json.dumps(record, ensure_ascii=False))
+                    f.write('\n]\n')
             
             elif format == 'csv':
                 import csv
                 export_path = f"data/history_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
                 with open(export_path, 'w', newline='', encoding='utf-8') as f:
-                    if history:
-                        writer = csv.DictWriter(f, fieldnames=history[0].keys())
-                        writer.writeheader()
-                        writer.writerows(history)
+                    writer = None
+                    for record in history:
+                        if writer is None:
+                            writer = csv.DictWriter(f, fieldnames=record.keys())
+                            writer.writeheader()
+                        writer.writerow(record)
             
             logger.info(f"История экспортирована в {export_path}")
             return export_path
@@ -407,18 +763,14 @@ class SolutionHistory:
             True если успешно
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._lock, self._conn as conn:
                 cursor = conn.cursor()
                 
+                # Заметки и теги удаляются каскадно вместе с записями
                 if older_than_days:
-                    cursor.execute("""
-                        DELETE FROM solution_history 
-                        WHERE created_at < datetime('now', '-{} days')
-                    """.format(older_than_days))
+                    cursor.execute(_DELETE_OLDER_SQL, (f"-{int(older_than_days)}",))
                 else:
                     cursor.execute("DELETE FROM solution_history")
-                    cursor.execute("DELETE FROM user_notes")
-                    cursor.execute("DELETE FROM history_tags")
                 
                 deleted_count = cursor.rowcount
                 conn.commit()
@@ -6,21 +6,85 @@ import cv2
 import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+# Минимальный наклон строк (в градусах), при котором изображение поворачивается
+_MIN_SKEW_ANGLE = 5.0
+
+# Окно и смещение адаптивной бинаризации
+_THRESHOLD_BLOCK = 11
+_THRESHOLD_C = 2
+# Начиная с этого числа пикселей бинаризация делится на горизонтальные полосы
+_PARALLEL_MIN_PIXELS = 1_000_000
+_CPU_COUNT = os.cpu_count() or 1
+# OpenCV отпускает GIL, поэтому полосы обрабатываются потоками параллельно
+_STRIP_POOL = ThreadPoolExecutor(max_workers=_CPU_COUNT, thread_name_prefix="binarize")
+
 class ImagePreprocessor:
     """Класс для предобработки изображений перед OCR"""
     
-    def __init__(self):
-        self.supported_formats = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff']
+    def __init__(self, high_quality_denoise: bool = False):
+        """
+        Args:
+            high_quality_denoise: Нелокальное среднее вместо билатерального
+                фильтра при удалении шума (медленнее в десятки раз)
+        """
+        self.supported_formats = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.tiff'})
+        self.high_quality_denoise = high_quality_denoise
+        # Ядро для морфологических операций
+        self._kernel_2x2 = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+        self._use_cuda = self._cuda_available()
+        # Рабочие буферы промежуточных результатов и CLAHE, свои у каждого потока
+        self._local = threading.local()
+    
+    @staticmethod
+    def _cuda_available() -> bool:
+        """Есть ли OpenCV с поддержкой CUDA и доступное устройство"""
+        try:
+            return cv2.cuda.getCudaEnabledDeviceCount() > 0
+        except (AttributeError, cv2.error):
+            return False
     
-    def preprocess_image(self, image_path: str) -> np.ndarray:
+    def _get_clahe(self):
+        """
+        CLAHE текущего потока
+        
+        Создается один раз на поток, а не на каждое изображение: объект
+        хранит внутренние буферы и не может использоваться потоками совместно.
+        """
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return clahe
+    
+    def _buffer(self, name: str, shape: tuple) -> np.ndarray:
+        """
+        Переиспользуемый буфер для промежуточного результата пайплайна
+        
+        Буфер пересоздается только при смене размера изображения,
+        поэтому серия скриншотов одного размера обходится без выделений памяти.
+        Результат, возвращаемый наружу, в такие буферы не пишется.
+        """
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buffer
+    
+    def preprocess_image(self, image_path: str, max_width: int = 2000) -> np.ndarray:
         """
         Основной метод предобработки изображения
         
         Args:
             image_path: Путь к изображению
+            max_width: Более широкие изображения уменьшаются до этой ширины
             
         Returns:
             Обработанное изображение как numpy array
@@ -28,18 +92,29 @@ class ImagePreprocessor:
         try:
             # Загрузка изображения
             if isinstance(image_path, str):
-                image = cv2.imread(image_path)
+                # Пайплайну нужен только серый канал: декодер сразу отдает
+                # яркость, без восстановления цвета и конвертации BGR
+                image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
             else:
                 image = image_path
                 
             if image is None:
                 raise ValueError("Не удалось загрузить изображение")
             
+            # Оттенки серого считаются один раз: по ним определяется
+            # ориентация, их же поворачивает и обрабатывает пайплайн.
+            # Серое изображение лежит в рабочем буфере потока, поэтому
+            # исходное остается в image - его возвращает ветка ошибки
+            gray = image
+            if gray.ndim == 3:
+                gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY,
+                                    dst=self._buffer('gray', gray.shape[:2]))
+            
             # Автоматическое определение и исправление ориентации
-            image = self._fix_orientation(image)
+            gray = self._fix_orientation(gray)
             
             # Применение всех методов предобработки
-            processed = self._apply_preprocessing_pipeline(image)
+            processed = self._apply_preprocessing_pipeline(gray, max_width)
             
             return processed
             
@@ -47,14 +122,36 @@ class ImagePreprocessor:
             logger.error(f"Ошибка при предобработке изображения: {e}")
             return image
     
-    def _apply_preprocessing_pipeline(self, image: np.ndarray) -> np.ndarray:
+    def preprocess_batch(self, image_paths: list, max_workers: int = None,
+                         max_width: int = 2000) -> list:
+        """
+        Предобработка нескольких изображений параллельно
+        
+        OpenCV отпускает GIL, поэтому потоки загружают ядра процессора
+        полностью; буферы и CLAHE у каждого потока свои.
+        
+        Args:
+            image_paths: Пути к изображениям или сами изображения
+            max_workers: Число потоков (по умолчанию - по числу ядер)
+            max_width: Более широкие изображения уменьшаются до этой ширины
+            
+        Returns:
+            Обработанные изображения в порядке входного списка
+        """
+        with ThreadPoolExecutor(max_workers=max_workers or _CPU_COUNT) as executor:
+            return list(executor.map(
+                lambda image_path: self.preprocess_image(image_path, max_width),
+                image_paths
+            ))
+    
+    def _apply_preprocessing_pipeline(self, image: np.ndarray, max_width: int = 2000) -> np.ndarray:
         """Применение пайплайна предобработки"""
         
-        # 1. Изменение размера (если слишком маленькое)
-        image = self._resize_if_needed(image)
+        # 1. Изменение размера (если слишком маленькое или слишком большое)
+        image = self._resize_if_needed(image, max_width=max_width)
         
-        # 2. Конвертация в оттенки серого
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # 2. Конвертация в оттенки серого (если еще не выполнена)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
         
         # 3. Удаление шума
         denoised = self._denoise(gray)
@@ -82,39 +179,34 @@ class ImagePreprocessor:
         """
         try:
             # Конвертация в оттенки серого для анализа
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
             
-            # Детекция линий для определения ориентации
+            # Детекция отрезков для определения ориентации
             edges = cv2.Canny(gray, 50, 150, apertureSize=3)
-            lines = cv2.HoughLines(edges, 1, np.pi/180, threshold=100)
+            lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100,
+                                    minLineLength=50, maxLineGap=10)
             
             if lines is not None:
-                # Анализ углов линий
-                angles = []
-                for rho, theta in lines[:10]:  # Берем первые 10 линий
-                    angle = theta * 180 / np.pi
-                    if angle < 45 or angle > 135:
-                        angles.append(angle)
+                # Углы наклона всех отрезков одним вычислением;
+                # строки текста - отрезки, близкие к горизонтали
+                segments = lines[:, 0, :].astype(np.float32)
+                angles = np.degrees(np.arctan2(segments[:, 3] - segments[:, 1],
+                                               segments[:, 2] - segments[:, 0]))
+                angles = angles[np.abs(angles) < 45]
                 
-                if angles:
-                    # Определение доминирующего угла
-                    avg_angle = np.mean(angles)
+                if angles.size:
+                    # Медиана устойчива к единичным наклонным отрезкам
+                    skew_angle = float(np.median(angles))
                     
-                    # Если угол значительно отличается от 0/90 градусов
-                    if abs(avg_angle) > 5 and abs(avg_angle - 90) > 5:
-                        # Поворот изображения
+                    # Поворот только при заметном наклоне
+                    if abs(skew_angle) > _MIN_SKEW_ANGLE:
                         height, width = image.shape[:2]
                         center = (width // 2, height // 2)
                         
-                        # Определение угла поворота
-                        if avg_angle < 45:
-                            rotation_angle = -avg_angle
-                        else:
-                            rotation_angle = 90 - avg_angle
-                        
                         # Матрица поворота
-                        rotation_matrix = cv2.getRotationMatrix2D(center, rotation_angle, 1.0)
-                        rotated = cv2.warpAffine(image, rotation_matrix, (width, height))
+                        rotation_matrix = cv2.getRotationMatrix2D(center, skew_angle, 1.0)
+                        rotated = cv2.warpAffine(image, rotation_matrix, (width, height),
+                                                 borderMode=cv2.BORDER_REPLICATE)
                         
                         return rotated
             
@@ -124,48 +216,95 @@ class ImagePreprocessor:
             logger.warning(f"Ошибка при определении ориентации: {e}")
             return image
     
-    def _resize_if_needed(self, image: np.ndarray, min_width: int = 800) -> np.ndarray:
-        """Изменение размера изображения если оно слишком маленькое"""
+    def _resize_if_needed(self, image: np.ndarray, min_width: int = 800,
+                          max_width: int = 2000) -> np.ndarray:
+        """Изменение размера изображения если оно слишком маленькое или слишком большое"""
         height, width = image.shape[:2]
         
         if width < min_width:
             scale_factor = min_width / width
             new_width = int(width * scale_factor)
             new_height = int(height * scale_factor)
-            image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
-            
+            image = cv2.resize(image, (new_width, new_height),
+                               dst=self._buffer('resized', (new_height, new_width) + image.shape[2:]),
+                               interpolation=cv2.INTER_CUBIC)
+        elif width > max_width:
+            # Уменьшение крупных изображений: шумоподавление и
+            # бинаризация дешевеют пропорционально числу пикселей
+            scale_factor = max_width / width
+            new_width = max_width
+            new_height = max(1, int(height * scale_factor))
+            image = cv2.resize(image, (new_width, new_height),
+                               dst=self._buffer('resized', (new_height, new_width) + image.shape[2:]),
+                               interpolation=cv2.INTER_AREA)
+
         return image
     
     def _denoise(self, image: np.ndarray) -> np.ndarray:
         """Удаление шума с изображения"""
-        # Нелокальное среднее для удаления шума
-        denoised = cv2.fastNlMeansDenoising(image, None, 10, 7, 21)
-        return denoised
+        if self._use_cuda:
+            # Нелокальное среднее на GPU
+            gpu_image = cv2.cuda_GpuMat()
+            gpu_image.upload(image)
+            return cv2.cuda.fastNlMeansDenoising(
+                gpu_image, 10, search_window=21, block_size=7
+            ).download()
+        
+        if self.high_quality_denoise:
+            # Нелокальное среднее для удаления шума
+            return cv2.fastNlMeansDenoising(
+                image, self._buffer('denoised', image.shape), 10, 7, 21
+            )
+        
+        # На скриншотах шума мало: билатеральный фильтр за один проход
+        # сглаживает его, сохраняя края символов
+        return cv2.bilateralFilter(image, 7, 50, 50,
+                                   dst=self._buffer('denoised', image.shape))
     
     def _enhance_contrast(self, image: np.ndarray) -> np.ndarray:
         """Улучшение контраста изображения"""
         # CLAHE (Contrast Limited Adaptive Histogram Equalization)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(image)
+        enhanced = self._get_clahe().apply(image, dst=self._buffer('enhanced', image.shape))
         return enhanced
     
     def _binarize(self, image: np.ndarray) -> np.ndarray:
         """Бинаризация изображения"""
-        # Адаптивная бинаризация
-        binary = cv2.adaptiveThreshold(
-            image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
+        binary = self._buffer('binary', image.shape)
+        height = image.shape[0]
+        
+        if _CPU_COUNT < 2 or image.size < _PARALLEL_MIN_PIXELS:
+            # Адаптивная бинаризация
+            return cv2.adaptiveThreshold(
+                image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY, _THRESHOLD_BLOCK, _THRESHOLD_C, dst=binary
+            )
+        
+        # Порог пикселя зависит только от окна вокруг него, поэтому полосы
+        # с перекрытием в полокна дают тот же результат, что и целое изображение
+        halo = _THRESHOLD_BLOCK // 2
+        step = -(-height // _CPU_COUNT)
+        
+        def binarize_strip(top: int):
+            bottom = min(top + step, height)
+            start, end = max(0, top - halo), min(height, bottom + halo)
+            strip = cv2.adaptiveThreshold(
+                image[start:end], 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY, _THRESHOLD_BLOCK, _THRESHOLD_C
+            )
+            binary[top:bottom] = strip[top - start:bottom - start]
+        
+        list(_STRIP_POOL.map(binarize_strip, range(0, height, step)))
         return binary
     
     def _morphological_operations(self, image: np.ndarray) -> np.ndarray:
         """Морфологические операции для очистки"""
-        # Создание ядра для морфологических операций
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+        kernel = self._kernel_2x2
         
-        # Удаление мелких объектов
-        cleaned = cv2.morphologyEx(image, cv2.MORPH_CLOSE, kernel)
-        cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_OPEN, kernel)
+        # Удаление мелких объектов; закрытие выполняется на месте,
+        # в буфере бинаризации
+        cv2.morphologyEx(image, cv2.MORPH_CLOSE, kernel, dst=image)
+        # Итоговое изображение - новый массив, а не буфер потока
+        cleaned = cv2.morphologyEx(image, cv2.MORPH_OPEN, kernel)
         
         return cleaned
     
@@ -183,27 +322,31 @@ class ImagePreprocessor:
             # Конвертация в оттенки серого
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
             
-            # Применение фильтра Собеля для обнаружения краев
-            sobel = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-            sobel = np.uint8(np.absolute(sobel))
+            # Фильтр Шарра для обнаружения вертикальных краев; модуль,
+            # масштаб и приведение к uint8 - за один проход convertScaleAbs
+            gradient = cv2.Scharr(gray, cv2.CV_16S, 1, 0)
+            binary = cv2.convertScaleAbs(gradient)
             
-            # Бинаризация
-            _, binary = cv2.threshold(sobel, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            # Бинаризация на месте, без дополнительного буфера
+            cv2.threshold(binary, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=binary)
             
             # Поиск контуров
             contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
             
-            text_regions = []
-            for contour in contours:
-                # Фильтрация по размеру контура
-                area = cv2.contourArea(contour)
-                if area > 100:  # Минимальная площадь
-                    x, y, w, h = cv2.boundingRect(contour)
-                    # Фильтрация по соотношению сторон (текст обычно горизонтальный)
-                    if w > h and w > 20 and h > 10:
-                        text_regions.append((x, y, w, h))
-            
-            return text_regions
+            if not contours:
+                return []
+            
+            # Площади и описывающие прямоугольники всех контуров
+            areas = np.fromiter((cv2.contourArea(c) for c in contours),
+                                dtype=np.float64, count=len(contours))
+            rects = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int32)
+            widths, heights = rects[:, 2], rects[:, 3]
+            
+            # Фильтрация одной маской: минимальная площадь и соотношение
+            # сторон (текст обычно горизонтальный)
+            mask = (areas > 100) & (widths > heights) & (widths > 20) & (heights > 10)
+            
+            return [tuple(rect) for rect in rects[mask].tolist()]
             
         except Exception as e:
             logger.error(f"Ошибка при обнаружении областей текста: {e}")
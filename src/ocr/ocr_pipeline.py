@@ -0,0 +1,183 @@
+"""
+Конвейерная обработка изображений: детекция -> обрезка -> OCR
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .text_detector import TextDetector
+from .text_extractor import OCRResultBatch, TextExtractor
+
+logger = logging.getLogger(__name__)
+
+# Размер очередей между стадиями (ограничивает память под изображения)
+_QUEUE_SIZE = 16
+# Пакет фрагментов отправляется в OCR, как только набрано столько фрагментов...
+_BATCH_THRESHOLD = 16
+# ...или самый старый фрагмент ждет дольше этого времени (секунды)
+_MAX_WAIT = 0.05
+
+
+class PipelinedOCR:
+    """
+    Конвейер OCR для серии изображений
+
+    Детекция областей, обрезка и распознавание выполняются в отдельных
+    потоках, связанных ограниченными очередями: пока OCR распознает фрагменты
+    одного изображения, детектор уже обрабатывает следующее. Фрагменты
+    собираются в пакеты для TextExtractor.extract_text_batched.
+    """
+
+    def __init__(self, detector: Optional[TextDetector] = None,
+                 extractor: Optional[TextExtractor] = None,
+                 batch_threshold: int = _BATCH_THRESHOLD, max_wait: float = _MAX_WAIT,
+                 queue_size: int = _QUEUE_SIZE, use_multiple_engines: bool = True):
+        self.detector = detector or TextDetector()
+        self.extractor = extractor or TextExtractor()
+        self.batch_threshold = batch_threshold
+        self.max_wait = max_wait
+        self.queue_size = queue_size
+        self.use_multiple_engines = use_multiple_engines
+
+    def process(self, images: Iterable[np.ndarray]) -> List[List[OCRResultBatch]]:
+        """
+        Распознавание текста на серии изображений
+
+        Args:
+            images: Изображения для обработки
+
+        Returns:
+            Для каждого изображения (в порядке входа) - результаты OCR
+            (OCRResultBatch) по каждой найденной текстовой области
+        """
+        detect_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        crop_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        ocr_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        results: Dict[int, List[OCRResultBatch]] = {}
+
+        workers = [
+            threading.Thread(target=self._detect_worker, args=(detect_queue, crop_queue),
+                             name="ocr-detect", daemon=True),
+            threading.Thread(target=self._crop_worker, args=(crop_queue, ocr_queue),
+                             name="ocr-crop", daemon=True),
+            threading.Thread(target=self._ocr_worker, args=(ocr_queue, results),
+                             name="ocr-recognize", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        count = 0
+        try:
+            for image in images:
+                detect_queue.put((count, image))
+                count += 1
+        finally:
+            # None - сигнал завершения, передается по цепочке стадий
+            detect_queue.put(None)
+            for worker in workers:
+                worker.join()
+
+        return [results.get(index, []) for index in range(count)]
+
+    @staticmethod
+    def _drain(source: queue.Queue):
+        """Чтение очереди до сигнала завершения (после сбоя стадии), чтобы
+        предыдущая стадия и вызывающий код не блокировались на put"""
+        while source.get() is not None:
+            pass
+
+    def _detect_worker(self, source: queue.Queue, sink: queue.Queue):
+        """Стадия 1: детекция текстовых областей"""
+        try:
+            while True:
+                item = source.get()
+                if item is None:
+                    return
+
+                index, image = item
+                try:
+                    regions = self.detector.detect_text_regions(image)
+                except Exception as e:
+                    logger.error(f"Ошибка детекции в конвейере OCR: {e}")
+                    regions = []
+                sink.put((index, image, regions))
+        except Exception as e:
+            logger.error(f"Сбой стадии детекции конвейера OCR: {e}")
+            self._drain(source)
+        finally:
+            # Сигнал завершения передается дальше при любом исходе
+            sink.put(None)
+
+    def _crop_worker(self, source: queue.Queue, sink: queue.Queue):
+        """Стадия 2: обрезка найденных областей"""
+        try:
+            while True:
+                item = source.get()
+                if item is None:
+                    return
+
+                index, image, regions = item
+                try:
+                    crops = list(self.detector.crop_text_regions(image, regions))
+                except Exception as e:
+                    logger.error(f"Ошибка обрезки в конвейере OCR: {e}")
+                    crops = []
+                sink.put((index, crops))
+        except Exception as e:
+            logger.error(f"Сбой стадии обрезки конвейера OCR: {e}")
+            self._drain(source)
+        finally:
+            sink.put(None)
+
+    def _ocr_worker(self, source: queue.Queue, results: Dict[int, List[OCRResultBatch]]):
+        """Стадия 3: распознавание фрагментов динамическими пакетами"""
+        # Буфер фрагментов: (индекс изображения, номер области, фрагмент)
+        buffer = []
+        oldest = 0.0
+        done = False
+
+        try:
+            while not done:
+                # Пока буфер пуст, ждать нечего; иначе - не дольше max_wait
+                # с момента поступления самого старого фрагмента
+                timeout = None if not buffer else max(0.0, oldest + self.max_wait - time.monotonic())
+                try:
+                    item = source.get(timeout=timeout)
+                except queue.Empty:
+                    item = ()
+
+                if item is None:
+                    done = True
+                elif item:
+                    index, crops = item
+                    results[index] = [OCRResultBatch.from_results([]) for _ in crops]
+                    if crops and not buffer:
+                        oldest = time.monotonic()
+                    buffer.extend((index, position, crop) for position, crop in enumerate(crops))
+
+                if buffer and (done or len(buffer) >= self.batch_threshold
+                               or time.monotonic() - oldest >= self.max_wait):
+                    self._recognize_batch(buffer, results)
+                    buffer = []
+        except Exception as e:
+            logger.error(f"Сбой стадии распознавания конвейера OCR: {e}")
+            if not done:
+                self._drain(source)
+
+    def _recognize_batch(self, buffer: list, results: Dict[int, List[OCRResultBatch]]):
+        """Пакетное распознавание буфера и раскладка результатов по изображениям"""
+        try:
+            batch = self.extractor.extract_text_batched(
+                [crop for _, _, crop in buffer], self.use_multiple_engines
+            )
+        except Exception as e:
+            logger.error(f"Ошибка распознавания в конвейере OCR: {e}")
+            return
+
+        for (index, position, _), region_results in zip(buffer, batch):
+            results[index][position] = region_results
@@ -0,0 +1,91 @@
+"""
+OCR в пуле процессов
+
+Модуль импортируется дочерними процессами пула, поэтому содержит только
+то, что нужно для OCR: ни базы знаний, ни классификатора, ни клиентов сети.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .image_preprocessor import ImagePreprocessor
+from .text_extractor import OCRResult, TextExtractor
+
+logger = logging.getLogger(__name__)
+
+# Компоненты OCR процесса-обработчика (создаются инициализатором пула)
+_preprocessor: Optional[ImagePreprocessor] = None
+_extractor: Optional[TextExtractor] = None
+
+
+def _start_method() -> str:
+    """
+    Способ запуска процессов пула
+
+    fork копирует процесс вместе с потоками, захваченными ими блокировками
+    и открытыми соединениями, поэтому не используется: forkserver (Linux)
+    порождает процессы из чистого сервера, spawn - из нового интерпретатора.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return "forkserver"
+    return "spawn"
+
+
+def _init_worker():
+    """Инициализатор процесса пула: модели OCR загружаются один раз на процесс"""
+    global _preprocessor, _extractor
+    _preprocessor = ImagePreprocessor()
+    _extractor = TextExtractor()
+
+
+def create_ocr_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Пул процессов для OCR
+
+    Args:
+        max_workers: Число процессов (по умолчанию - по числу ядер)
+    """
+    context = multiprocessing.get_context(_start_method())
+    if context.get_start_method() == "forkserver":
+        # Сервер один раз импортирует этот модуль (OpenCV, EasyOCR, torch),
+        # процессы пула получают уже загруженные модули
+        context.set_forkserver_preload([__name__])
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=context, initializer=_init_worker
+    )
+
+
+def run_ocr_pipeline(source: Union[str, bytes]) -> Optional[Tuple[Optional[OCRResult], Dict[str, Any]]]:
+    """
+    OCR конвейер для выполнения в пуле процессов
+
+    Args:
+        source: Путь к файлу или содержимое файла в памяти
+
+    Returns:
+        None, если изображение не загрузилось; иначе (лучший результат OCR
+        или None, если текст не распознан; структурированная информация об ошибке)
+    """
+    if isinstance(source, bytes):
+        image = cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        image = cv2.imread(source)
+    if image is None:
+        return None
+
+    # Предобработка
+    processed_image = _preprocessor.preprocess_image(image)
+
+    # Извлечение текста
+    ocr_results = _extractor.extract_text(processed_image)
+    if not ocr_results:
+        return None, {}
+
+    best_result = _extractor.select_best_result(ocr_results)
+    error_info = _extractor.extract_structured_error_info(best_result.text)
+    return best_result, error_info
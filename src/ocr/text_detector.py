@@ -6,6 +6,7 @@ import cv2
 import numpy as np
 from typing import List, Tuple, Optional
 import logging
+import threading
 from pathlib import Path
 
 try:
@@ -22,6 +23,10 @@ class TextDetector:
     """Класс для детекции текстовых областей с помощью CRAFT"""
     
     def __init__(self):
+        # Ядро морфологии создается один раз, а не на каждое изображение
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+        # Рабочие буферы детекции, свои у каждого потока
+        self._local = threading.local()
         self.craft_available = TORCH_AVAILABLE
         if self.craft_available:
             self._load_craft_model()
@@ -36,6 +41,17 @@ class TextDetector:
             logger.warning(f"Не удалось загрузить CRAFT модель: {e}")
             self.craft_available = False
     
+    def _buffer(self, name: str, shape: tuple) -> np.ndarray:
+        """Переиспользуемый буфер потока; пересоздается только при смене размера"""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buffer
+    
     def detect_text_regions(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """
         Детекция текстовых областей
@@ -58,12 +74,17 @@ class TextDetector:
     def _detect_with_opencv(self, image: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """Детекция текста с помощью OpenCV"""
         try:
-            # Конвертация в оттенки серого
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            shape = image.shape[:2]
+            
+            # Конвертация в оттенки серого (если изображение цветное)
+            if image.ndim == 3:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._buffer('gray', shape))
+            else:
+                gray = image
             
             # Применение морфологических операций
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            morph = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel)
+            morph = cv2.morphologyEx(gray, cv2.MORPH_CLOSE, self._kernel,
+                                     dst=self._buffer('morph', shape))
             
             # Поиск контуров
             contours, _ = cv2.findContours(morph, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
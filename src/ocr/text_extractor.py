@@ -6,9 +6,14 @@ import pytesseract
 import easyocr
 import cv2
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Sequence, Union
+import hashlib
 import logging
+import os
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
 try:
@@ -17,8 +22,45 @@ try:
 except ImportError:
     PADDLEOCR_AVAILABLE = False
 
+try:
+    import onnxruntime as ort
+    import torch
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Tesseract работает отдельными процессами: потоки лишь ждут их завершения
+_TESSERACT_WORKERS = os.cpu_count() or 1
+
+# LRU кэш результатов OCR по содержимому изображения: повторяющиеся фрагменты
+# (заголовки окон, типовые диалоги) не распознаются заново
+_OCR_CACHE_SIZE = 4096
+# Крупные изображения почти всегда уникальны и только вытесняли бы фрагменты
+_OCR_CACHE_MAX_SIZE = 500_000
+
+# Определение языка: короткие тексты считаются регулярными выражениями,
+# длинные - масками NumPy по кодам символов (UTF-32)
+_RUSSIAN_CHAR_RE = re.compile(r'[а-яё]')
+_ENGLISH_CHAR_RE = re.compile(r'[a-z]')
+_LANGUAGE_NUMPY_MIN_LENGTH = 256
+
+
+def _image_digest(image: np.ndarray) -> bytes:
+    """Хэш содержимого изображения (вместе с размером и типом)"""
+    data = np.ascontiguousarray(image)
+    hasher = xxhash.xxh64() if XXHASH_AVAILABLE else hashlib.blake2b(digest_size=8)
+    hasher.update(f"{data.shape}{data.dtype.str}".encode())
+    hasher.update(data)
+    return hasher.digest()
+
 @dataclass
 class OCRResult:
     """Результат OCR распознавания"""
@@ -28,20 +70,107 @@ class OCRResult:
     language: str
     bounding_boxes: Optional[List[Tuple[int, int, int, int]]] = None
 
+# Коды движков и языков для столбцов OCRResultBatch
+_ENGINES = ('tesseract', 'easyocr', 'paddleocr')
+_LANGUAGES = ('rus', 'eng')
+
+class OCRResultBatch:
+    """
+    Набор результатов OCR в виде столбцов
+    
+    Уверенности, движки и языки хранятся массивами NumPy, поэтому выбор
+    по ним выполняется векторно, без обхода отдельных объектов.
+    batch[i] возвращает обычный OCRResult.
+    """
+    
+    def __init__(self, texts: List[str], confidences: np.ndarray, engines: np.ndarray,
+                 languages: np.ndarray, bboxes: List[Optional[List[Tuple[int, int, int, int]]]]):
+        self.texts = texts
+        self.confidences = confidences
+        self.engines = engines
+        self.languages = languages
+        self.bboxes = bboxes
+    
+    @classmethod
+    def from_results(cls, results: Sequence[OCRResult]) -> "OCRResultBatch":
+        """Сборка столбцов из списка результатов"""
+        return cls(
+            texts=[result.text for result in results],
+            confidences=np.fromiter((result.confidence for result in results),
+                                    dtype=np.float64, count=len(results)),
+            engines=np.fromiter((_ENGINES.index(result.engine) for result in results),
+                                dtype=np.uint8, count=len(results)),
+            languages=np.fromiter((_LANGUAGES.index(result.language) for result in results),
+                                  dtype=np.uint8, count=len(results)),
+            bboxes=[result.bounding_boxes for result in results]
+        )
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    def __getitem__(self, index: int) -> OCRResult:
+        return OCRResult(
+            text=self.texts[index],
+            confidence=float(self.confidences[index]),
+            engine=_ENGINES[self.engines[index]],
+            language=_LANGUAGES[self.languages[index]],
+            bounding_boxes=self.bboxes[index]
+        )
+    
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+class _OnnxDetector:
+    """
+    Детектор CRAFT для EasyOCR на ONNX Runtime вместо PyTorch
+    
+    Модель экспортируется штатным скриптом EasyOCR:
+    python -m easyocr.export --dynamic -d <путь к .onnx>
+    """
+    
+    def __init__(self, model_path: str):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = os.cpu_count() or 1
+        # Сессия создается один раз и живет вместе с TextExtractor
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def __call__(self, x):
+        # EasyOCR передает тензор torch и ожидает пару (карты текста, признаки)
+        y, feature = self.session.run(None, {self.input_name: x.cpu().numpy()})
+        return torch.from_numpy(y), torch.from_numpy(feature)
+
 class TextExtractor:
     """Класс для извлечения текста с изображений"""
     
-    def __init__(self):
+    def __init__(self, onnx_path: str = "data/models/easyocr_detector.onnx"):
+        """
+        Args:
+            onnx_path: Детектор EasyOCR, экспортированный в ONNX; если файл есть
+                и установлен onnxruntime, детекция выполняется через ONNX Runtime
+        """
+        self.onnx_path = onnx_path
+        
         # Настройка Tesseract
         self.tesseract_config = '--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯабвгдеёжзийклмнопрстуфхцчшщъыьэюя.,!?;:()[]{}<>-_=+@#$%^&*|\\/"\'`~№'
         
         # Инициализация EasyOCR
         try:
-            self.easyocr_reader = easyocr.Reader(['ru', 'en'], gpu=False)
+            self.easyocr_reader = easyocr.Reader(['ru', 'en'], gpu=False, cudnn_benchmark=True)
         except Exception as e:
             logger.warning(f"Не удалось инициализировать EasyOCR: {e}")
             self.easyocr_reader = None
         
+        if self.easyocr_reader and ONNXRUNTIME_AVAILABLE and os.path.exists(self.onnx_path):
+            try:
+                self.easyocr_reader.detector = _OnnxDetector(self.onnx_path)
+                logger.info(f"Детектор EasyOCR работает через ONNX Runtime: {self.onnx_path}")
+            except Exception as e:
+                logger.warning(f"Не удалось загрузить ONNX детектор, используется PyTorch: {e}")
+        
         # Инициализация PaddleOCR
         try:
             self.paddleocr_reader = PaddleOCR(use_angle_cls=True, lang='ch', use_gpu=False)
@@ -69,6 +198,66 @@ class TextExtractor:
                 r'[A-Z]{2,5}-\d{3,5}',  # Коды типа SQL-001
             ]
         }
+        
+        # Ключевые слова - одно скомпилированное выражение с альтернативами:
+        # один проход по тексту вместо прохода на каждое слово
+        self._error_keywords_re = re.compile(
+            '|'.join(self.error_patterns['error_keywords']), re.IGNORECASE
+        )
+        # Коды ошибок ищутся каждым шаблоном отдельно: в общей альтернативе
+        # совпадение одного шаблона поглощало бы совпадения других (SQL-001 и 001)
+        self._error_code_res = [
+            re.compile(pattern, re.IGNORECASE) for pattern in self.error_patterns['error_codes']
+        ]
+        
+        # LRU кэш результатов OCR: ключ - (хэш изображения, движок)
+        self._ocr_cache = OrderedDict()
+        self._ocr_cache_lock = threading.Lock()
+    
+    def _cache_get(self, key: tuple) -> Optional[OCRResult]:
+        """Получение результата из LRU кэша"""
+        with self._ocr_cache_lock:
+            result = self._ocr_cache.get(key)
+            if result is not None:
+                self._ocr_cache.move_to_end(key)
+            return result
+    
+    def _cache_put(self, key: tuple, result: OCRResult):
+        """Сохранение результата в LRU кэш"""
+        with self._ocr_cache_lock:
+            self._ocr_cache[key] = result
+            self._ocr_cache.move_to_end(key)
+            if len(self._ocr_cache) > _OCR_CACHE_SIZE:
+                self._ocr_cache.popitem(last=False)
+    
+    def _extract_cached(self, engine: str, extract_batch, images: List[np.ndarray]) -> List[Optional[OCRResult]]:
+        """
+        Распознавание через кэш: движок вызывается только для изображений,
+        которых еще нет в кэше (одним пакетом)
+        """
+        keys = [
+            (_image_digest(image), engine) if image.size <= _OCR_CACHE_MAX_SIZE else None
+            for image in images
+        ]
+        results = [self._cache_get(key) if key else None for key in keys]
+        
+        # Одинаковые фрагменты внутри пакета распознаются один раз
+        missing: Dict[object, List[int]] = {}
+        for i, result in enumerate(results):
+            if result is None:
+                missing.setdefault(keys[i] or i, []).append(i)
+        
+        if missing:
+            groups = list(missing.values())
+            extracted = extract_batch([images[group[0]] for group in groups])
+            for group, result in zip(groups, extracted):
+                for i in group:
+                    results[i] = result
+                # Неудачи не кэшируются: ошибка движка может быть временной
+                if result is not None and keys[group[0]]:
+                    self._cache_put(keys[group[0]], result)
+        
+        return results
     
     def extract_text(self, image: np.ndarray, use_multiple_engines: bool = True) -> List[OCRResult]:
         """
@@ -85,7 +274,9 @@ class TextExtractor:
         
         # Tesseract OCR
         try:
-            tesseract_result = self._extract_with_tesseract(image)
+            tesseract_result = self._extract_cached(
+                'tesseract', lambda images: [self._extract_with_tesseract(images[0])], [image]
+            )[0]
             if tesseract_result:
                 results.append(tesseract_result)
         except Exception as e:
@@ -94,7 +285,9 @@ class TextExtractor:
         # EasyOCR (если доступен)
         if use_multiple_engines and self.easyocr_reader:
             try:
-                easyocr_result = self._extract_with_easyocr(image)
+                easyocr_result = self._extract_cached(
+                    'easyocr', lambda images: [self._extract_with_easyocr(images[0])], [image]
+                )[0]
                 if easyocr_result:
                     results.append(easyocr_result)
             except Exception as e:
@@ -103,7 +296,9 @@ class TextExtractor:
         # PaddleOCR (если доступен)
         if use_multiple_engines and PADDLEOCR_AVAILABLE and self.paddleocr_reader:
             try:
-                paddleocr_result = self._extract_with_paddleocr(image)
+                paddleocr_result = self._extract_cached(
+                    'paddleocr', lambda images: [self._extract_with_paddleocr(images[0])], [image]
+                )[0]
                 if paddleocr_result:
                     results.append(paddleocr_result)
             except Exception as e:
@@ -111,48 +306,114 @@ class TextExtractor:
         
         return results
     
-    def _extract_with_tesseract(self, image: np.ndarray) -> Optional[OCRResult]:
-        """Извлечение текста с помощью Tesseract"""
+    def extract_text_batched(self, images: List[np.ndarray],
+                             use_multiple_engines: bool = True) -> List[OCRResultBatch]:
+        """
+        Пакетное извлечение текста из нескольких фрагментов
+        
+        Рассчитано на области текста (например, из TextDetector.crop_text_regions):
+        каждый движок вызывается один раз на весь пакет, а не на каждый фрагмент.
+        
+        Args:
+            images: Фрагменты изображений
+            use_multiple_engines: Использовать несколько OCR движков
+            
+        Returns:
+            Результаты OCR (OCRResultBatch) для каждого фрагмента в порядке входа
+        """
+        results: List[List[OCRResult]] = [[] for _ in images]
+        if not images:
+            return []
+        
+        batches = [self._extract_cached('tesseract', self._extract_batch_with_tesseract, images)]
+        
+        # EasyOCR (если доступен)
+        if use_multiple_engines and self.easyocr_reader:
+            batches.append(self._extract_cached('easyocr', self._extract_batch_with_easyocr, images))
+        
+        # PaddleOCR (если доступен)
+        if use_multiple_engines and PADDLEOCR_AVAILABLE and self.paddleocr_reader:
+            batches.append(self._extract_cached('paddleocr', self._extract_batch_with_paddleocr, images))
+        
+        for batch in batches:
+            for image_results, result in zip(results, batch):
+                if result:
+                    image_results.append(result)
+        
+        return [OCRResultBatch.from_results(image_results) for image_results in results]
+    
+    def _extract_batch_with_tesseract(self, images: List[np.ndarray]) -> List[Optional[OCRResult]]:
+        """Tesseract для пакета: процессы распознавания запускаются параллельно"""
+        workers = min(len(images), _TESSERACT_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._extract_with_tesseract, images))
+    
+    def _extract_batch_with_easyocr(self, images: List[np.ndarray]) -> List[Optional[OCRResult]]:
+        """EasyOCR для пакета: фрагменты дополняются до общего размера"""
         try:
-            # Распознавание на русском и английском
-            text_rus = pytesseract.image_to_string(
-                image, lang='rus', config=self.tesseract_config
-            )
-            text_eng = pytesseract.image_to_string(
-                image, lang='eng', config=self.tesseract_config
-            )
+            height = max(image.shape[0] for image in images)
+            width = max(image.shape[1] for image in images)
             
-            # Получение данных с уверенностью
-            data_rus = pytesseract.image_to_data(
-                image, lang='rus', config=self.tesseract_config, output_type=pytesseract.Output.DICT
-            )
-            data_eng = pytesseract.image_to_data(
-                image, lang='eng', config=self.tesseract_config, output_type=pytesseract.Output.DICT
-            )
+            # Дополнение краем, а не растяжение: пропорции символов сохраняются
+            padded = [
+                cv2.copyMakeBorder(image, 0, height - image.shape[0], 0, width - image.shape[1],
+                                   cv2.BORDER_REPLICATE)
+                for image in images
+            ]
+            # Нормализацию и перестановку осей HWC -> CHW не дублируем: EasyOCR
+            # делает ее сам по каждому изображению до сборки пакета в тензор.
+            # Собственная предобработка в torch должна поступать так же
+            # (np.transpose до torch.from_numpy, без permute промежуточного
+            # массива (B, H, W, C)) - иначе PyTorch копирует весь пакет
+            batch = self.easyocr_reader.readtext_batched(padded, n_width=width, n_height=height)
             
-            # Выбор лучшего результата
-            if len(text_rus.strip()) > len(text_eng.strip()):
-                text = text_rus
-                data = data_rus
-                language = 'rus'
-            else:
-                text = text_eng
-                data = data_eng
-                language = 'eng'
+            return [self._easyocr_result(results) for results in batch]
             
-            # Расчет средней уверенности
-            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном извлечении текста EasyOCR: {e}")
+            return [None] * len(images)
+    
+    def _extract_batch_with_paddleocr(self, images: List[np.ndarray]) -> List[Optional[OCRResult]]:
+        """PaddleOCR для пакета: распознавание фрагментов без повторной детекции"""
+        try:
+            # Без детекции PaddleOCR принимает список изображений
+            # и распознает его одним пакетом
+            batch = self.paddleocr_reader.ocr(images, det=False, cls=True)
+            
+            return [self._paddleocr_result([(None, line)]) for line in batch[0]]
+            
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном извлечении текста PaddleOCR: {e}")
+            return [None] * len(images)
+    
+    def _extract_with_tesseract(self, image: np.ndarray) -> Optional[OCRResult]:
+        """Извлечение текста с помощью Tesseract"""
+        try:
+            # Один проход по обеим языковым моделям вместо отдельных
+            # запусков rus и eng для текста и для данных
+            data = pytesseract.image_to_data(
+                image, lang='rus+eng', config=self.tesseract_config, output_type=pytesseract.Output.DICT
+            )
             
-            # Извлечение bounding boxes
+            # Слова с уверенностью, сгруппированные по строкам
+            lines = {}
+            confidences = []
             bounding_boxes = []
             for i in range(len(data['text'])):
-                if int(data['conf'][i]) > 0:
-                    x = data['left'][i]
-                    y = data['top'][i]
-                    w = data['width'][i]
-                    h = data['height'][i]
-                    bounding_boxes.append((x, y, w, h))
+                conf = int(float(data['conf'][i]))
+                if conf > 0:
+                    confidences.append(conf)
+                    bounding_boxes.append(
+                        (data['left'][i], data['top'][i], data['width'][i], data['height'][i])
+                    )
+                    word = data['text'][i].strip()
+                    if word:
+                        line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                        lines.setdefault(line_key, []).append(word)
+            
+            text = '\n'.join(' '.join(words) for words in lines.values())
+            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            language = self._detect_language(text)
             
             return OCRResult(
                 text=text.strip(),
@@ -166,46 +427,62 @@ class TextExtractor:
             logger.error(f"Ошибка при извлечении текста Tesseract: {e}")
             return None
     
+    @staticmethod
+    def _detect_language(text: str) -> str:
+        """Язык текста по преобладающему алфавиту"""
+        text = text.lower()
+        if len(text) < _LANGUAGE_NUMPY_MIN_LENGTH:
+            russian_chars = len(_RUSSIAN_CHAR_RE.findall(text))
+            english_chars = len(_ENGLISH_CHAR_RE.findall(text))
+        else:
+            codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+            russian_chars = np.count_nonzero(
+                ((codes >= ord('а')) & (codes <= ord('я'))) | (codes == ord('ё'))
+            )
+            english_chars = np.count_nonzero((codes >= ord('a')) & (codes <= ord('z')))
+        
+        return 'rus' if russian_chars > english_chars else 'eng'
+    
     def _extract_with_easyocr(self, image: np.ndarray) -> Optional[OCRResult]:
         """Извлечение текста с помощью EasyOCR"""
         try:
-            results = self.easyocr_reader.readtext(image)
-            
-            if not results:
-                return None
-            
-            # Объединение всех найденных текстов
-            texts = []
-            bounding_boxes = []
-            total_confidence = 0
-            
-            for (bbox, text, confidence) in results:
-                if text.strip():
-                    texts.append(text.strip())
-                    bounding_boxes.append(bbox)
-                    total_confidence += confidence
-            
-            combined_text = ' '.join(texts)
-            avg_confidence = total_confidence / len(results) if results else 0
-            
-            # Определение языка (простая эвристика)
-            russian_chars = len(re.findall(r'[а-яё]', combined_text.lower()))
-            english_chars = len(re.findall(r'[a-z]', combined_text.lower()))
-            
-            language = 'rus' if russian_chars > english_chars else 'eng'
-            
-            return OCRResult(
-                text=combined_text,
-                confidence=avg_confidence * 100,  # Приведение к процентам
-                engine='easyocr',
-                language=language,
-                bounding_boxes=bounding_boxes
-            )
+            return self._easyocr_result(self.easyocr_reader.readtext(image))
             
         except Exception as e:
             logger.error(f"Ошибка при извлечении текста EasyOCR: {e}")
             return None
     
+    @staticmethod
+    def _easyocr_result(results: list) -> Optional[OCRResult]:
+        """Сборка OCRResult из ответа EasyOCR"""
+        if not results:
+            return None
+        
+        # Объединение всех найденных текстов
+        texts = []
+        bounding_boxes = []
+        total_confidence = 0
+        
+        for (bbox, text, confidence) in results:
+            if text.strip():
+                texts.append(text.strip())
+                bounding_boxes.append(bbox)
+                total_confidence += confidence
+        
+        combined_text = ' '.join(texts)
+        avg_confidence = total_confidence / len(results) if results else 0
+        
+        # Определение языка (простая эвристика)
+        language = TextExtractor._detect_language(combined_text)
+        
+        return OCRResult(
+            text=combined_text,
+            confidence=avg_confidence * 100,  # Приведение к процентам
+            engine='easyocr',
+            language=language,
+            bounding_boxes=bounding_boxes
+        )
+    
     def _extract_with_paddleocr(self, image: np.ndarray) -> Optional[OCRResult]:
         """Извлечение текста с помощью PaddleOCR"""
         try:
@@ -215,85 +492,84 @@ class TextExtractor:
             if not results or not results[0]:
                 return None
             
-            texts = []
-            bounding_boxes = []
-            total_confidence = 0
-            count = 0
-            
-            for line in results[0]:
-                if len(line) >= 2:
-                    bbox, (text, confidence) = line
-                    if text.strip():
-                        texts.append(text.strip())
-                        bounding_boxes.append(bbox)
-                        total_confidence += confidence
-                        count += 1
-            
-            if not texts:
-                return None
-            
-            combined_text = ' '.join(texts)
-            avg_confidence = total_confidence / count if count > 0 else 0
-            
-            # Определение языка (простая эвристика)
-            russian_chars = len(re.findall(r'[а-яё]', combined_text.lower()))
-            english_chars = len(re.findall(r'[a-z]', combined_text.lower()))
-            
-            language = 'rus' if russian_chars > english_chars else 'eng'
-            
-            return OCRResult(
-                text=combined_text,
-                confidence=avg_confidence * 100,  # Приведение к процентам
-                engine='paddleocr',
-                language=language,
-                bounding_boxes=bounding_boxes
-            )
+            return self._paddleocr_result(results[0])
             
         except Exception as e:
             logger.error(f"Ошибка при извлечении текста PaddleOCR: {e}")
             return None
     
-    def select_best_result(self, results: List[OCRResult]) -> Optional[OCRResult]:
+    @staticmethod
+    def _paddleocr_result(lines: list) -> Optional[OCRResult]:
+        """Сборка OCRResult из строк PaddleOCR ([bbox, (текст, уверенность)])"""
+        texts = []
+        bounding_boxes = []
+        total_confidence = 0
+        count = 0
+        
+        for line in lines:
+            if len(line) >= 2:
+                bbox, (text, confidence) = line
+                if text.strip():
+                    texts.append(text.strip())
+                    # Без детекции (пакетный режим) координат нет
+                    if bbox is not None:
+                        bounding_boxes.append(bbox)
+                    total_confidence += confidence
+                    count += 1
+        
+        if not texts:
+            return None
+        
+        combined_text = ' '.join(texts)
+        avg_confidence = total_confidence / count if count > 0 else 0
+        
+        # Определение языка (простая эвристика)
+        language = TextExtractor._detect_language(combined_text)
+        
+        return OCRResult(
+            text=combined_text,
+            confidence=avg_confidence * 100,  # Приведение к процентам
+            engine='paddleocr',
+            language=language,
+            bounding_boxes=bounding_boxes
+        )
+    
+    def select_best_result(self, results: Union[List[OCRResult], OCRResultBatch]) -> Optional[OCRResult]:
         """
         Выбор лучшего результата из нескольких OCR движков
         
         Args:
-            results: Список результатов OCR
+            results: Список результатов OCR или OCRResultBatch
             
         Returns:
             Лучший результат или None
         """
-        if not results:
+        if not len(results):
             return None
         
-        # Сортировка по уверенности
-        sorted_results = sorted(results, key=lambda x: x.confidence, reverse=True)
+        if not isinstance(results, OCRResultBatch):
+            # Результаты с ключевыми словами ошибок имеют приоритет, среди них
+            # (или среди всех) - наивысшая уверенность; при равенстве - первый
+            return max(results, key=lambda r: (self._contains_error_keywords(r.text), r.confidence))
         
-        # Дополнительная проверка на наличие ключевых слов ошибок
-        for result in sorted_results:
-            if self._contains_error_keywords(result.text):
-                return result
-        
-        # Возврат результата с наивысшей уверенностью
-        return sorted_results[0]
+        # Столбцы пакета: тот же выбор через маску и argmax
+        has_keywords = np.fromiter(
+            (self._contains_error_keywords(text) for text in results.texts),
+            dtype=bool, count=len(results)
+        )
+        candidates = np.flatnonzero(has_keywords) if has_keywords.any() else np.arange(len(results))
+        return results[int(candidates[np.argmax(results.confidences[candidates])])]
     
     def _contains_error_keywords(self, text: str) -> bool:
         """Проверка наличия ключевых слов ошибок в тексте"""
-        text_lower = text.lower()
-        
-        for pattern in self.error_patterns['error_keywords']:
-            if re.search(pattern, text_lower):
-                return True
-        
-        return False
+        return self._error_keywords_re.search(text) is not None
     
     def extract_error_codes(self, text: str) -> List[str]:
         """Извлечение кодов ошибок из текста"""
         error_codes = []
         
-        for pattern in self.error_patterns['error_codes']:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            error_codes.extend(matches)
+        for pattern in self._error_code_res:
+            error_codes.extend(pattern.findall(text))
         
         return list(set(error_codes))  # Удаление дубликатов
     
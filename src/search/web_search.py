@@ -2,24 +2,133 @@
 Модуль веб-поиска решений в интернете
 """
 
+import asyncio
+import importlib.util
 import requests
 import logging
 from typing import List, Dict, Optional
-from urllib.parse import quote_plus
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlsplit, urlunsplit
 import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Разбор HTML: selectolax (парсер lexbor на C) при наличии, иначе BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser, LexborNode as Node
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Предел размера загружаемой страницы: тело читается потоком и обрезается
+_MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# Порты по умолчанию не входят в канонический URL
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def _canonical_url(url: str) -> str:
+    """
+    Канонический вид URL для поиска дубликатов
+    
+    Схема и хост в нижнем регистре, без порта по умолчанию, фрагмента,
+    меток utm_* и завершающего слэша; параметры запроса отсортированы.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+            host = f"{host}:{parts.port}"
+        query = urlencode(sorted(
+            (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith('utm_')
+        ))
+        path = parts.path.rstrip('/') or '/'
+        return urlunsplit((scheme, host, path, query, ''))
+    except ValueError:
+        return url
+
+# Служебные элементы, не относящиеся к содержимому страницы
+_NON_CONTENT_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside']
+
+def _parse_html(content: bytes):
+    """Разбор HTML: дерево selectolax или BeautifulSoup"""
+    if SELECTOLAX_AVAILABLE:
+        return HTMLParser(content)
+    return BeautifulSoup(content, 'html.parser')
+
+def _is_selectolax(node) -> bool:
+    return SELECTOLAX_AVAILABLE and isinstance(node, (HTMLParser, Node))
+
+def _node_text(node) -> str:
+    """Текст элемента с обрезанными пробелами (как get_text(strip=True))"""
+    if _is_selectolax(node):
+        return node.text(strip=True)
+    return node.get_text(strip=True)
+
+def _node_attr(node, name: str) -> Optional[str]:
+    """Значение атрибута элемента"""
+    if _is_selectolax(node):
+        return node.attributes.get(name)
+    return node.get(name)
+
+def create_async_client() -> Optional["httpx.AsyncClient"]:
+    """
+    Общий асинхронный HTTP клиент для веб-поиска
+    
+    Создается один раз на процесс: пул соединений (TCP/TLS) переиспользуется
+    между запросами. HTTP/2 включается, если установлен пакет h2.
+    """
+    if not HTTPX_AVAILABLE:
+        logger.warning("httpx не установлен, веб-поиск будет синхронным")
+        return None
+    
+    return httpx.AsyncClient(
+        timeout=5.0,
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+        http2=importlib.util.find_spec("h2") is not None,
+        headers={'User-Agent': USER_AGENT},
+        follow_redirects=True
+    )
+
+def create_client():
+    """
+    Синхронный HTTP клиент для веб-поиска
+    
+    httpx.Client держит пул соединений (keep-alive) и, если установлен h2,
+    мультиплексирует запросы к одному хосту по HTTP/2. Без httpx
+    используется requests.Session.
+    """
+    if not HTTPX_AVAILABLE:
+        session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT})
+        return session
+    
+    return httpx.Client(
+        timeout=15.0,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        http2=importlib.util.find_spec("h2") is not None,
+        headers={'User-Agent': USER_AGENT},
+        follow_redirects=True
+    )
+
 class WebSearch:
     """Класс для поиска решений в интернете"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    def __init__(self, async_client: Optional["httpx.AsyncClient"] = None):
+        self.session = create_client()
+        # Общий асинхронный клиент для search_solutions_async (владелец - вызывающий код)
+        self.async_client = async_client
         
         # Источники для поиска
         self.search_sources = {
@@ -59,16 +168,60 @@ class WebSearch:
         solutions = []
         
         try:
-            # Поиск в специализированных источниках
+            # Поиск в специализированных источниках: запросы идут параллельно,
+            # общее время - самый медленный источник, а не сумма
             if application_type and application_type in self.search_sources:
-                for source in self.search_sources[application_type]:
-                    try:
-                        source_solutions = self._search_in_source(
+                sources = self.search_sources[application_type]
+                with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+                    for source_solutions in executor.map(
+                        lambda source: self._search_in_source(
                             error_text, source, application_type, max_results
-                        )
+                        ),
+                        sources
+                    ):
                         solutions.extend(source_solutions)
-                    except Exception as e:
-                        logger.error(f"Ошибка поиска в {source}: {e}")
+            
+            # Общий поиск в Google (если доступен)
+            google_solutions = self._search_google(error_text, application_type, max_results)
+            solutions.extend(google_solutions)
+            
+            # Удаление дубликатов и сортировка по релевантности
+            unique_solutions = self._deduplicate_solutions(solutions)
+            return unique_solutions[:max_results]
+            
+        except Exception as e:
+            logger.error(f"Ошибка веб-поиска: {e}")
+            return []
+    
+    async def search_solutions_async(self, error_text: str, application_type: str = None,
+                                     max_results: int = 5) -> List[Dict]:
+        """
+        Асинхронный поиск решений через общий HTTP клиент
+        
+        Args:
+            error_text: Текст ошибки
+            application_type: Тип приложения
+            max_results: Максимальное количество результатов
+            
+        Returns:
+            Список найденных решений
+        """
+        if self.async_client is None:
+            return await asyncio.to_thread(
+                self.search_solutions, error_text, application_type, max_results
+            )
+        
+        solutions = []
+        
+        try:
+            # Поиск в специализированных источниках: все запросы одновременно
+            # через общий клиент
+            if application_type and application_type in self.search_sources:
+                for source_solutions in await asyncio.gather(*(
+                    self._search_in_source_async(error_text, source, application_type, max_results)
+                    for source in self.search_sources[application_type]
+                )):
+                    solutions.extend(source_solutions)
             
             # Общий поиск в Google (если доступен)
             google_solutions = self._search_google(error_text, application_type, max_results)
@@ -104,6 +257,50 @@ class WebSearch:
             logger.error(f"Ошибка поиска в Google: {e}")
             return []
     
+    def _fetch(self, url: str, timeout: float) -> bytes:
+        """
+        Загрузка страницы потоком
+        
+        Тело читается частями и не более _MAX_PAGE_BYTES: большие страницы
+        не держат соединение и память дольше, чем нужно для разбора.
+        """
+        chunks = []
+        size = 0
+        
+        if HTTPX_AVAILABLE and isinstance(self.session, httpx.Client):
+            with self.session.stream('GET', url, timeout=timeout) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= _MAX_PAGE_BYTES:
+                        break
+        else:
+            with self.session.get(url, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=65536):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= _MAX_PAGE_BYTES:
+                        break
+        
+        return b''.join(chunks)[:_MAX_PAGE_BYTES]
+    
+    async def _fetch_async(self, url: str, timeout: float) -> bytes:
+        """Асинхронная загрузка страницы потоком (аналог _fetch)"""
+        chunks = []
+        size = 0
+        
+        async with self.async_client.stream('GET', url, timeout=timeout) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= _MAX_PAGE_BYTES:
+                    break
+        
+        return b''.join(chunks)[:_MAX_PAGE_BYTES]
+    
     def _search_in_source(self, query: str, source: str, application_type: str, 
                          max_results: int) -> List[Dict]:
         """Поиск в конкретном источнике"""
@@ -112,19 +309,37 @@ class WebSearch:
             search_url = self._build_search_url(source, query, application_type)
             
             # Получение страницы
-            response = self.session.get(search_url, timeout=10)
-            response.raise_for_status()
+            content = self._fetch(search_url, timeout=10)
             
             # Парсинг результатов
-            soup = BeautifulSoup(response.content, 'html.parser')
-            results = self._parse_search_results(soup, source, max_results)
+            return self._parse_search_page(content, source, max_results)
+            
+        except Exception as e:
+            logger.error(f"Ошибка поиска в {source}: {e}")
+            return []
+    
+    async def _search_in_source_async(self, query: str, source: str, application_type: str,
+                                      max_results: int) -> List[Dict]:
+        """Асинхронный поиск в конкретном источнике"""
+        try:
+            search_url = self._build_search_url(source, query, application_type)
             
-            return results
+            content = await self._fetch_async(search_url, timeout=10)
+            
+            # Разбор HTML занимает процессор - он выполняется в потоке,
+            # чтобы не задерживать остальные запросы в цикле событий
+            return await asyncio.to_thread(
+                self._parse_search_page, content, source, max_results
+            )
             
         except Exception as e:
             logger.error(f"Ошибка поиска в {source}: {e}")
             return []
     
+    def _parse_search_page(self, content: bytes, source: str, max_results: int) -> List[Dict]:
+        """Разбор страницы результатов поиска"""
+        return self._parse_search_results(_parse_html(content), source, max_results)
+    
     def _build_search_url(self, source: str, query: str, application_type: str) -> str:
         """Построение URL для поиска"""
         if '1c.ru' in source:
@@ -138,18 +353,21 @@ class WebSearch:
         else:
             return f"{source}/search?q={quote_plus(query)}"
     
-    def _parse_search_results(self, soup: BeautifulSoup, source: str, 
+    def _parse_search_results(self, document, source: str, 
                             max_results: int) -> List[Dict]:
-        """Парсинг результатов поиска"""
+        """Парсинг результатов поиска (document - дерево selectolax или BeautifulSoup)"""
         results = []
         
         try:
             # Поиск ссылок на результаты
-            links = soup.find_all('a', href=True)
+            if _is_selectolax(document):
+                links = document.css('a[href]')
+            else:
+                links = document.find_all('a', href=True)
             
             for link in links[:max_results * 2]:  # Берем больше для фильтрации
-                href = link.get('href')
-                title = link.get_text(strip=True)
+                href = _node_attr(link, 'href')
+                title = _node_text(link)
                 
                 # Фильтрация релевантных ссылок
                 if self._is_relevant_link(href, title, source):
@@ -206,10 +424,10 @@ class WebSearch:
             # Поиск ближайшего текстового элемента
             parent = link_element.parent
             if parent:
-                text = parent.get_text(strip=True)
+                text = _node_text(parent)
                 # Ограничение длины
                 return text[:200] + "..." if len(text) > 200 else text
-            return link_element.get_text(strip=True)
+            return _node_text(link_element)
         except:
             return ""
     
@@ -236,36 +454,38 @@ class WebSearch:
         return min(1.0, max(0.0, relevance))
     
     def _deduplicate_solutions(self, solutions: List[Dict]) -> List[Dict]:
-        """Удаление дубликатов решений"""
-        seen_urls = set()
-        unique_solutions = []
-        
+        """Удаление дубликатов решений (по каноническому URL, остается первое вхождение)"""
+        # Словарь сохраняет порядок вставки и заменяет отдельные set + list;
+        # адреса, отличающиеся порядком параметров, метками utm_* или
+        # завершающим слэшем, считаются одним решением
+        unique_solutions = {}
         for solution in solutions:
-            if solution['url'] not in seen_urls:
-                seen_urls.add(solution['url'])
-                unique_solutions.append(solution)
+            unique_solutions.setdefault(_canonical_url(solution['url']), solution)
         
-        return unique_solutions
+        return list(unique_solutions.values())
     
     def get_detailed_solution(self, url: str) -> Optional[Dict]:
         """Получение детального решения по URL"""
         try:
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            document = _parse_html(self._fetch(url, timeout=15))
             
             # Извлечение основного контента
-            content = self._extract_main_content(soup)
+            content = self._extract_main_content(document)
             
             # Извлечение кода (если есть)
-            code_blocks = self._extract_code_blocks(soup)
+            code_blocks = self._extract_code_blocks(document)
+            
+            if _is_selectolax(document):
+                title_node = document.css_first('title')
+                title = title_node.text() if title_node else ''
+            else:
+                title = document.title.get_text() if document.title else ''
             
             return {
                 'url': url,
                 'content': content,
                 'code_blocks': code_blocks,
-                'title': soup.title.get_text() if soup.title else '',
+                'title': title,
                 'extracted_at': time.time()
             }
             
@@ -273,11 +493,16 @@ class WebSearch:
             logger.error(f"Ошибка получения детального решения: {e}")
             return None
     
-    def _extract_main_content(self, soup: BeautifulSoup) -> str:
+    def _extract_main_content(self, document) -> str:
         """Извлечение основного контента страницы"""
+        selectolax = _is_selectolax(document)
+        
         # Удаление служебных элементов
-        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-            element.decompose()
+        if selectolax:
+            document.strip_tags(_NON_CONTENT_TAGS)
+        else:
+            for element in document(_NON_CONTENT_TAGS):
+                element.decompose()
         
         # Поиск основного контента
         main_selectors = [
@@ -286,22 +511,27 @@ class WebSearch:
         ]
         
         for selector in main_selectors:
-            content = soup.select_one(selector)
+            content = document.css_first(selector) if selectolax else document.select_one(selector)
             if content:
-                return content.get_text(strip=True)
+                return _node_text(content)
         
         # Fallback - весь текст страницы
-        return soup.get_text(strip=True)
+        if selectolax:
+            return _node_text(document.root) if document.root else ''
+        return document.get_text(strip=True)
     
-    def _extract_code_blocks(self, soup: BeautifulSoup) -> List[str]:
+    def _extract_code_blocks(self, document) -> List[str]:
         """Извлечение блоков кода"""
         code_blocks = []
         
         # Поиск блоков кода
-        code_elements = soup.find_all(['code', 'pre'])
+        if _is_selectolax(document):
+            code_elements = document.css('code, pre')
+        else:
+            code_elements = document.find_all(['code', 'pre'])
         
         for element in code_elements:
-            code_text = element.get_text(strip=True)
+            code_text = _node_text(element)
             if len(code_text) > 10:  # Минимальная длина для кода
                 code_blocks.append(code_text)
         
@@ -11,11 +11,18 @@ import pickle
 
 try:
     import redis
+    import redis.asyncio as aioredis
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
     logging.warning("Redis не установлен. Кэширование недоступно.")
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 class CacheManager:
@@ -256,4 +263,169 @@ class CacheManager:
             return True
         except Exception as e:
             logger.error(f"Ошибка очистки кэша: {e}")
-            return False 
\ No newline at end of file
+            return False 
+
+
+class AsyncCacheManager:
+    """Асинхронный менеджер кэширования с Redis для обработчиков FastAPI
+    
+    Значения хранятся в JSON (orjson при наличии): в кэш попадают
+    ответы API, которые и так сериализуются в JSON.
+    """
+    
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0):
+        self.redis_available = REDIS_AVAILABLE
+        self.redis_client = None
+        
+        if self.redis_available:
+            # Соединение открывается лениво, проверка - в connect()
+            self.redis_client = aioredis.Redis(
+                host=host,
+                port=port,
+                db=db,
+                decode_responses=False,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+    
+    async def connect(self) -> bool:
+        """
+        Проверка подключения к Redis (вызывается при запуске приложения)
+        
+        Returns:
+            True если Redis доступен
+        """
+        if not self.redis_available or not self.redis_client:
+            return False
+        
+        try:
+            await self.redis_client.ping()
+            logger.info("Redis подключен успешно")
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось подключиться к Redis: {e}")
+            self.redis_available = False
+            return False
+    
+    async def close(self):
+        """Закрытие соединений с Redis"""
+        if self.redis_client:
+            try:
+                await self.redis_client.aclose()
+            except Exception as e:
+                logger.error(f"Ошибка закрытия соединения с Redis: {e}")
+    
+    @staticmethod
+    def _dumps(value: Any) -> bytes:
+        return orjson.dumps(value) if ORJSON_AVAILABLE else json.dumps(value).encode()
+    
+    @staticmethod
+    def _loads(value: bytes) -> Any:
+        return orjson.loads(value) if ORJSON_AVAILABLE else json.loads(value)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Получение значения из кэша
+        
+        Args:
+            key: Ключ кэша
+            
+        Returns:
+            Значение или None
+        """
+        if not self.redis_available or not self.redis_client:
+            return None
+        
+        try:
+            value = await self.redis_client.get(key)
+            if value:
+                return self._loads(value)
+            return None
+        except Exception as e:
+            logger.error(f"Ошибка получения из кэша: {e}")
+            return None
+    
+    async def set(self, key: str, value: Any, expire: int = 3600) -> bool:
+        """
+        Сохранение значения в кэш
+        
+        Args:
+            key: Ключ кэша
+            value: Значение для сохранения (JSON-совместимое)
+            expire: Время жизни в секундах
+            
+        Returns:
+            True если успешно
+        """
+        if not self.redis_available or not self.redis_client:
+            return False
+        
+        try:
+            return bool(await self.redis_client.setex(key, expire, self._dumps(value)))
+        except Exception as e:
+            logger.error(f"Ошибка сохранения в кэш: {e}")
+            return False
+    
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """Получение двоичного значения из кэша без десериализации"""
+        if not self.redis_available or not self.redis_client:
+            return None
+        
+        try:
+            return await self.redis_client.get(key)
+        except Exception as e:
+            logger.error(f"Ошибка получения из кэша: {e}")
+            return None
+    
+    async def set_raw(self, key: str, value: bytes, expire: int = 3600) -> bool:
+        """Сохранение двоичного значения в кэш без сериализации"""
+        if not self.redis_available or not self.redis_client:
+            return False
+        
+        try:
+            return bool(await self.redis_client.setex(key, expire, value))
+        except Exception as e:
+            logger.error(f"Ошибка сохранения в кэш: {e}")
+            return False
+    
+    async def delete(self, key: str) -> bool:
+        """
+        Удаление значения из кэша
+        
+        Args:
+            key: Ключ кэша
+            
+        Returns:
+            True если успешно
+        """
+        if not self.redis_available or not self.redis_client:
+            return False
+        
+        try:
+            return bool(await self.redis_client.delete(key))
+        except Exception as e:
+            logger.error(f"Ошибка удаления из кэша: {e}")
+            return False
+    
+    async def clear_pattern(self, pattern: str) -> int:
+        """
+        Очистка кэша по паттерну
+        
+        Args:
+            pattern: Паттерн ключей (например, "api:*")
+            
+        Returns:
+            Количество удаленных ключей
+        """
+        if not self.redis_available or not self.redis_client:
+            return 0
+        
+        try:
+            # SCAN вместо KEYS: не блокирует Redis на больших базах
+            keys = [key async for key in self.redis_client.scan_iter(match=pattern)]
+            if keys:
+                return await self.redis_client.delete(*keys)
+            return 0
+        except Exception as e:
+            logger.error(f"Ошибка очистки кэша: {e}")
+            return 0
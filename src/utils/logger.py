@@ -6,10 +6,11 @@ import sys
 from pathlib import Path
 from loguru import logger
 
-from config import Config
+from config import get_config
 
 def setup_logger():
     """Настройка логгера"""
+    config = get_config()
     
     # Удаление стандартного обработчика
     logger.remove()
@@ -17,27 +18,27 @@ def setup_logger():
     # Консольный вывод
     logger.add(
         sys.stdout,
-        format=Config.LOG_FORMAT,
-        level=Config.LOG_LEVEL,
+        format=config.LOG_FORMAT,
+        level=config.LOG_LEVEL,
         colorize=True
     )
     
     # Файловый вывод
     logger.add(
-        Config.LOG_FILE,
-        format=Config.LOG_FORMAT,
-        level=Config.LOG_LEVEL,
+        config.LOG_FILE,
+        format=config.LOG_FORMAT,
+        level=config.LOG_LEVEL,
         rotation="1 day",
         retention="7 days",
         compression="zip"
     )
     
     # Отладочный файл (только для DEBUG)
-    if Config.LOG_LEVEL == "DEBUG":
-        debug_file = Config.LOGS_DIR / "debug.log"
+    if config.LOG_LEVEL == "DEBUG":
+        debug_file = config.LOGS_DIR / "debug.log"
         logger.add(
             debug_file,
-            format=Config.LOG_FORMAT,
+            format=config.LOG_FORMAT,
             level="DEBUG",
             rotation="1 day",
             retention="3 days"
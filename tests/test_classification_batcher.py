@@ -0,0 +1,134 @@
+"""
+Тесты для пакетной классификации ошибок
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавление пути к модулям
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.ai.classification_batcher import ClassificationBatcher
+from src.ai.error_classifier import ErrorClassifier
+
+class _StubClassifier:
+    """Классификатор-заглушка: запоминает пакеты, результат - текст ошибки"""
+
+    def __init__(self, error: Exception = None):
+        self.batches = []
+        self.error = error
+
+    async def classify_many(self, items):
+        self.batches.append([error_text for error_text, _ in items])
+        if self.error is not None:
+            raise self.error
+        return [error_text.upper() for error_text, _ in items]
+
+async def _classify_all(batcher, texts, timeout=1.0):
+    """Одновременная классификация нескольких текстов через запущенный батчер"""
+    batcher.start()
+    try:
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.classify(text, {}) for text in texts), return_exceptions=True),
+            timeout
+        )
+    finally:
+        await batcher.stop()
+
+class TestClassificationBatcher:
+    """Тесты микробатчинга классификации"""
+
+    def test_flush_by_size(self):
+        """Набранный пакет отправляется сразу, не дожидаясь окна ожидания"""
+        classifier = _StubClassifier()
+        batcher = ClassificationBatcher(classifier, max_size=3, max_wait=30.0)
+
+        results = asyncio.run(_classify_all(batcher, ["a", "b", "c"]))
+
+        assert results == ["A", "B", "C"]
+        assert classifier.batches == [["a", "b", "c"]]
+
+    def test_flush_by_deadline(self):
+        """Неполный пакет отправляется по истечении окна ожидания"""
+        classifier = _StubClassifier()
+        batcher = ClassificationBatcher(classifier, max_size=10, max_wait=0.05)
+
+        results = asyncio.run(_classify_all(batcher, ["a", "b"]))
+
+        assert results == ["A", "B"]
+        assert classifier.batches == [["a", "b"]]
+
+    def test_size_splits_batches(self):
+        """Запросы сверх размера пакета уходят следующим пакетом"""
+        classifier = _StubClassifier()
+        batcher = ClassificationBatcher(classifier, max_size=2, max_wait=0.05)
+
+        results = asyncio.run(_classify_all(batcher, ["a", "b", "c"]))
+
+        assert results == ["A", "B", "C"]
+        assert classifier.batches == [["a", "b"], ["c"]]
+
+    def test_exception_reaches_every_waiter(self):
+        """Ошибка пакетной классификации передается всем ожидающим"""
+        error = RuntimeError("LLM недоступен")
+        batcher = ClassificationBatcher(_StubClassifier(error), max_size=3, max_wait=0.05)
+
+        results = asyncio.run(_classify_all(batcher, ["a", "b", "c"]))
+
+        assert results == [error, error, error]
+
+    def test_without_worker_classifies_directly(self):
+        """Без запущенной задачи запрос классифицируется напрямую"""
+        async def classify_error_async(error_text, error_info):
+            return error_text.upper()
+
+        classifier = SimpleNamespace(classify_error_async=classify_error_async)
+        batcher = ClassificationBatcher(classifier)
+        assert asyncio.run(batcher.classify("a", {})) == "A"
+
+class _StubAsyncLLM:
+    """Асинхронный клиент LLM: возвращает заданный JSON ответ"""
+
+    def __init__(self, content: str):
+        self.requests = []
+
+        async def create(**kwargs):
+            self.requests.append(kwargs)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+class TestClassifyMany:
+    """Тесты пакетной классификации ErrorClassifier.classify_many"""
+
+    def test_keeps_input_order_with_short_llm_answer(self):
+        """Ответ LLM короче пакета: порядок сохраняется, остальное - по правилам"""
+        classifier = ErrorClassifier(llm_provider="groq")
+        answer = {"results": [{
+            "application_type": "1c", "error_category": "ai", "severity": "high",
+            "keywords": ["sql"], "confidence": 90, "suggested_actions": []
+        }]}
+        llm = _StubAsyncLLM(json.dumps(answer))
+        classifier.llm = object()
+        classifier._provider_kind = "groq"
+        classifier._async_llm = llm
+
+        # Первый текст уже есть в кэше и в запрос к LLM не попадает
+        cached = classifier._classify_with_rules("Ошибка в кэше", {})
+        classifier._cache_put(("Ошибка в кэше", ()), cached)
+        items = [
+            ("Ошибка в кэше", {}),
+            ("Ошибка SQL в 1С", {}),
+            ("Нет доступа к файлу windows", {}),
+        ]
+
+        results = asyncio.run(classifier.classify_many(items))
+
+        assert len(llm.requests) == 1
+        assert len(results) == 3
+        assert results[0] is cached
+        assert results[1].error_category == "ai"
+        assert results[2] == classifier._classify_with_rules("Нет доступа к файлу windows", {})
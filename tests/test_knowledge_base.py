@@ -0,0 +1,148 @@
+"""
+Тесты для базы знаний
+"""
+
+import pytest
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+# Добавление пути к модулям
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database import knowledge_base
+from src.database.knowledge_base import KnowledgeBase, Solution
+
+# Таблица решений до появления версий схемы: теги хранились JSON-массивом
+_BASELINE_SCHEMA = """
+    CREATE TABLE solutions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        error_text TEXT NOT NULL,
+        solution_text TEXT NOT NULL,
+        application_type TEXT,
+        error_category TEXT,
+        source TEXT,
+        success_rate REAL,
+        created_at TEXT NOT NULL,
+        tags TEXT,
+        steps TEXT
+    )
+"""
+
+def _solution(error_text, solution_text, application_type="1c", tags=None):
+    return Solution(
+        id=None,
+        error_text=error_text,
+        solution_text=solution_text,
+        application_type=application_type,
+        error_category="sql",
+        source="test",
+        success_rate=0.5,
+        created_at="2024-01-01T00:00:00",
+        tags=tags or [],
+        steps=["Шаг 1"]
+    )
+
+@pytest.fixture
+def make_kb(tmp_path, monkeypatch):
+    """Фабрика баз знаний без векторного поиска (только SQLite)"""
+    monkeypatch.setattr(knowledge_base, "CHROMA_AVAILABLE", False)
+    monkeypatch.setattr(knowledge_base, "FAISS_AVAILABLE", False)
+    created = []
+
+    def make(db_path=None):
+        kb = KnowledgeBase(db_path or str(tmp_path / "solutions.db"), str(tmp_path / "chroma"))
+        created.append(kb)
+        return kb
+
+    yield make
+    for kb in created:
+        kb.close()
+
+class TestKnowledgeBaseTextSearch:
+    """Тесты полнотекстового поиска и обновления схемы"""
+
+    def test_fts_query_quotes_user_text(self):
+        """Операторы FTS5 в тексте пользователя не разбираются"""
+        assert KnowledgeBase._fts_query('Ошибка "SQL" AND NOT (x*)') == '"Ошибка SQL AND NOT x"*'
+        assert KnowledgeBase._fts_query('*** ()') == ""
+
+    def test_text_search_by_phrase_and_prefix(self, make_kb):
+        """Поиск находит решения по фразе и по началу последнего слова"""
+        kb = make_kb()
+        if not kb._fts_available:
+            pytest.skip("SQLite собран без FTS5")
+        kb.add_solution(_solution("Ошибка блокировки таблицы", "Перезапустить сервер"))
+        kb.add_solution(_solution("Нет доступа к файлу", "Проверить права", "windows"))
+
+        assert [s.error_text for s in kb.search_solutions("блокировки табл")] == [
+            "Ошибка блокировки таблицы"
+        ]
+        assert [s.error_text for s in kb.search_solutions("права")] == ["Нет доступа к файлу"]
+        assert kb.search_solutions("права", application_type="1c") == []
+        # Операторы FTS5 в запросе не вызывают ошибку синтаксиса
+        assert [s.error_text for s in kb.search_solutions('Нет "доступа')] == ["Нет доступа к файлу"]
+
+    def test_upgrade_baseline_database(self, tmp_path, make_kb):
+        """Старая база: теги из JSON переводятся в строку, решения индексируются"""
+        db_path = str(tmp_path / "old.db")
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(_BASELINE_SCHEMA)
+            conn.execute(
+                "INSERT INTO solutions (error_text, solution_text, application_type, error_category, "
+                "source, success_rate, created_at, tags, steps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ("Ошибка соединения с сервером", "Проверить сеть", "1c", "connection", "test",
+                 0.9, "2024-01-01", json.dumps(["сеть", "сервер"], ensure_ascii=False),
+                 json.dumps(["Шаг 1"], ensure_ascii=False))
+            )
+        conn.close()
+
+        kb = make_kb(db_path)
+
+        with kb._get_conn() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+            assert conn.execute("SELECT tags FROM solutions").fetchone()[0] == "сеть,сервер"
+
+        solution = kb.get_solution_by_id(1)
+        assert solution.tags == ["сеть", "сервер"]
+        assert solution.steps == ["Шаг 1"]
+
+        # Решения, добавленные до появления FTS, попадают в индекс
+        if kb._fts_available:
+            assert [s.id for s in kb.search_solutions("соединения")] == [1]
+
+class TestKnowledgeBaseRankFusion:
+    """Тесты объединения векторного и текстового поиска"""
+
+    def test_results_in_fused_rank_order(self, make_kb):
+        """Решения возвращаются в порядке Reciprocal Rank Fusion"""
+        kb = make_kb()
+        if not kb._fts_available:
+            pytest.skip("SQLite собран без FTS5")
+        for error_text in ("Ошибка сервера", "Ошибка сервера базы", "Ошибка сервера лицензий",
+                           "Сбой обновления"):
+            kb.add_solution(_solution(error_text, "Решение"))
+
+        text_ids = kb._text_search("Ошибка сервера", limit=10)
+        assert sorted(text_ids) == [1, 2, 3]
+        first, second, third = text_ids
+        # Векторный поиск (заглушка): третий текстовый результат первым,
+        # решение без текстового совпадения - вторым
+        vector_ids = [third, 4, second]
+        kb.vector_store = object()
+        kb._vector_search = lambda query, application_type=None, limit=10: vector_ids[:limit]
+
+        results = kb.search_solutions("Ошибка сервера", limit=10)
+
+        # third: 1/60 + 1/62, second: 1/61 + 1/62, first: 1/60, 4: 1/61
+        assert [s.id for s in results] == [third, second, first, 4]
+
+    def test_solutions_by_ids_keeps_order(self, make_kb):
+        """Решения по списку ID возвращаются в порядке списка, отсутствующие пропускаются"""
+        kb = make_kb()
+        for number in range(5):
+            kb.add_solution(_solution(f"Ошибка {number}", "Решение"))
+
+        assert [s.id for s in kb._get_solutions_by_ids([3, 99, 1, 5])] == [3, 1, 5]
+        assert [s.id for s in kb._get_solutions_by_ids([5, 4, 3, 2, 1])] == [5, 4, 3, 2, 1]
@@ -0,0 +1,160 @@
+"""
+Тесты для истории решений
+"""
+
+import pytest
+import sqlite3
+import sys
+from pathlib import Path
+
+# Добавление пути к модулям
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.solution_history import SolutionHistory
+
+# Схема базы истории до появления версий (user_version = 0)
+_BASELINE_SCHEMA = """
+    CREATE TABLE solution_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        error_text TEXT NOT NULL,
+        error_type TEXT,
+        application_type TEXT,
+        solution_id INTEGER,
+        solution_title TEXT,
+        solution_description TEXT,
+        was_helpful BOOLEAN,
+        processing_time REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE user_notes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        history_id INTEGER,
+        note_text TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (history_id) REFERENCES solution_history (id)
+    );
+    CREATE TABLE history_tags (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        history_id INTEGER,
+        tag_name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (history_id) REFERENCES solution_history (id)
+    );
+"""
+
+@pytest.fixture
+def history(tmp_path):
+    """История решений во временной базе"""
+    history = SolutionHistory(str(tmp_path / "history.db"))
+    yield history
+    history.close()
+
+def _fts_rows(history):
+    """Содержимое полнотекстового индекса истории"""
+    with history._reader() as conn:
+        return [tuple(row) for row in conn.execute(
+            "SELECT rowid, error_text, solution_title, solution_description, notes, tags "
+            "FROM solution_history_fts ORDER BY rowid"
+        )]
+
+class TestSolutionHistorySearch:
+    """Тесты полнотекстового поиска в истории"""
+
+    def test_search_matches_notes_and_tags(self, history):
+        """Поиск находит запись по тексту заметки и тега"""
+        first = history.add_solution_record("Ошибка SQL", "sql", "1c", solution_title="Переиндексация")
+        second = history.add_solution_record("Нет доступа", "rights", "windows")
+        if not history._fts_available:
+            pytest.skip("SQLite собран без FTS5")
+
+        history.add_user_note(first, "помогла очистка кэша")
+        history.add_tag(second, "антивирус")
+
+        assert [r["id"] for r in history.search_history("очистка")] == [first]
+        assert [r["id"] for r in history.search_history("антивирус")] == [second]
+        # Поиск по тексту самой записи и по префиксу последнего слова
+        assert [r["id"] for r in history.search_history("переиндекс")] == [first]
+
+        found = history.search_history("очистка")[0]
+        assert found["notes"] == "помогла очистка кэша"
+
+    def test_clear_history_empties_fts(self, history):
+        """Полная очистка удаляет записи, заметки, теги и строки индекса"""
+        record_id = history.add_solution_record("Ошибка SQL", "sql", "1c")
+        if not history._fts_available:
+            pytest.skip("SQLite собран без FTS5")
+        history.add_user_note(record_id, "заметка")
+        history.add_tag(record_id, "тег")
+
+        assert history.clear_history()
+
+        assert _fts_rows(history) == []
+        with history._reader() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM user_notes").fetchone()[0] == 0
+            assert conn.execute("SELECT COUNT(*) FROM history_tags").fetchone()[0] == 0
+        assert history.search_history("заметка") == []
+
+    def test_feedback_does_not_change_fts(self, history):
+        """Отметка полезности не затрагивает полнотекстовый индекс"""
+        record_id = history.add_solution_record("Ошибка SQL", "sql", "1c", solution_title="Решение")
+        if not history._fts_available:
+            pytest.skip("SQLite собран без FTS5")
+        history.add_user_note(record_id, "заметка")
+        history.add_tag(record_id, "тег")
+        before = _fts_rows(history)
+
+        assert history.update_solution_feedback(record_id, True)
+
+        assert _fts_rows(history) == before
+        assert before == [(record_id, "Ошибка SQL", "Решение", "", "заметка", "тег")]
+
+class TestSolutionHistoryMigration:
+    """Тесты обновления схемы существующей базы"""
+
+    def test_upgrade_baseline_database(self, tmp_path):
+        """База старой схемы получает каскадные ключи, версию и триггеры FTS"""
+        db_path = str(tmp_path / "history.db")
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript(_BASELINE_SCHEMA)
+            conn.execute("INSERT INTO solution_history (id, error_text) VALUES (1, 'Ошибка SQL')")
+            conn.execute("INSERT INTO user_notes (history_id, note_text) VALUES (1, 'заметка')")
+            conn.execute("INSERT INTO history_tags (history_id, tag_name) VALUES (1, 'тег')")
+            # Заметка удаленной записи (внешние ключи в старой схеме не проверялись)
+            conn.execute("INSERT INTO user_notes (history_id, note_text) VALUES (42, 'сирота')")
+        conn.close()
+
+        history = SolutionHistory(db_path)
+        try:
+            with history._reader() as conn:
+                assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+
+                for table in ("user_notes", "history_tags"):
+                    foreign_keys = conn.execute(f"PRAGMA foreign_key_list({table})").fetchall()
+                    assert [(fk["table"], fk["on_delete"]) for fk in foreign_keys] == [
+                        ("solution_history", "CASCADE")
+                    ]
+
+                assert [tuple(row) for row in conn.execute(
+                    "SELECT history_id, note_text FROM user_notes"
+                )] == [(1, "заметка")]
+                assert [tuple(row) for row in conn.execute(
+                    "SELECT history_id, tag_name FROM history_tags"
+                )] == [(1, "тег")]
+
+                if history._fts_available:
+                    triggers = {row[0] for row in conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'history_fts_%'"
+                    )}
+                    assert len(triggers) == 7
+
+            if history._fts_available:
+                assert [r["id"] for r in history.search_history("заметка")] == [1]
+
+            # Удаление записи каскадно удаляет ее заметки и теги
+            assert history.clear_history()
+            with history._reader() as conn:
+                assert conn.execute("SELECT COUNT(*) FROM user_notes").fetchone()[0] == 0
+                assert conn.execute("SELECT COUNT(*) FROM history_tags").fetchone()[0] == 0
+        finally:
+            history.close()